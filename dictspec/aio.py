@@ -0,0 +1,104 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Validation for asyncio applications. Requires Python 3.
+
+The functions accept the same specs as `Validator` and return the same
+results and errors.
+"""
+
+import asyncio
+
+from .validator import Validator, ValidationError, ValidationResult, _walk
+
+async def validate(spec, data, steps=1000, executor_threshold=None, size=None, executor=None):
+    """
+    Validate `data` against `spec` (a spec, `CompiledSpec` or
+    `Validator`) without blocking the event loop for long.
+
+    The validation yields to the event loop after every `steps`
+    values. If `executor_threshold` is set and the `size` of the data
+    (defaults to the number of items of `data`) is larger, the data is
+    validated in `executor` (or the default executor of the loop)
+    instead.
+
+    Returns the `SampleStats` for sampled validations, otherwise None,
+    like `Validator.validate`.
+    """
+    validator = _validator(spec)
+    if executor_threshold is not None:
+        if size is None:
+            size = _size(data)
+        if size > executor_threshold:
+            loop = _get_running_loop()
+            return await loop.run_in_executor(executor, validator.validate, data)
+    run = validator._new_run()
+    try:
+        await _walk_run(validator, data, run, steps)
+        run.raise_errors()
+    except ValidationError as ex:
+        ex.sample_stats = run.sample_stats()
+        raise
+    return run.sample_stats()
+
+async def validate_many(spec, docs, steps=1000):
+    """
+    Validate each document of `docs`, which can be an async or normal
+    iterable. Yields a `ValidationResult` for each document, see
+    `Validator.validate_many`.
+    """
+    validator = _validator(spec)
+    i = 0
+    if hasattr(docs, '__aiter__'):
+        async for data in docs:
+            yield await _result(validator, i, data, steps)
+            i += 1
+    else:
+        for data in docs:
+            yield await _result(validator, i, data, steps)
+            i += 1
+
+# Python 3.6 has no get_running_loop, get_event_loop returns the running loop
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+def _validator(spec):
+    if isinstance(spec, Validator):
+        return spec
+    return Validator(spec)
+
+def _size(data):
+    if isinstance(data, (dict, list)):
+        return len(data)
+    return 0
+
+async def _walk_run(validator, data, run, steps):
+    for _ in _walk(validator.compiled_spec.root, data, run, steps):
+        await asyncio.sleep(0)
+
+async def _result(validator, index, data, steps):
+    run = validator._new_run()
+    try:
+        await _walk_run(validator, data, run, steps)
+    except ValidationError as ex:
+        return ValidationResult(index, data, ex.details, informal_only=ex.informal_only,
+            sample_stats=run.sample_stats())
+    return ValidationResult(index, data, run.details(), informal_only=not run.errors,
+        sample_stats=run.sample_stats())
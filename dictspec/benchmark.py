@@ -0,0 +1,239 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Benchmarks for the validator with synthetic documents.
+
+Run all benchmarks, save the results and compare a later run (e.g.
+after an upgrade) against them::
+
+    python -m dictspec.benchmark --save baseline.json
+    python -m dictspec.benchmark --compare baseline.json
+
+Reports the throughput in documents/s and MB/s (size of the documents
+as JSON) and the peak memory of the validation (Python 3 only). With
+``--compare``, the exit code is 1 if any benchmark got slower than the
+``--tolerance``.
+"""
+
+from __future__ import absolute_import, print_function
+
+import gc
+import json
+import optparse
+import random
+import sys
+import time
+
+from .validator import compile, Validator, ValidationError
+from .spec import required, one_of, number, recursive, type_spec, anything
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+class Benchmark(object):
+    """
+    A spec with a list of documents to validate.
+    """
+    def __init__(self, name, spec, docs, valid=True, **options):
+        self.name = name
+        self.spec = spec
+        self.docs = docs
+        self.valid = valid
+        self.options = options
+        self.size = sum(len(json.dumps(d)) for d in docs)
+
+def _wide_dicts(rnd, scale):
+    spec = dict(('key%d' % i, [int, str, float][i % 3]) for i in range(500))
+    doc = {}
+    for i in range(500):
+        doc['key%d' % i] = [rnd.randint(0, 1000), 'value%d' % i, rnd.random()][i % 3]
+    return spec, [dict(doc) for _ in range(_count(100, scale))]
+
+def _deep(rnd, depth):
+    doc = {'name': 'leaf', 'value': 1.0, 'children': []}
+    for i in range(depth):
+        doc = {'name': 'node%d' % i, 'value': rnd.random(),
+            'children': [doc, {'name': 'leaf', 'children': []}]}
+    return doc
+
+def _records(rnd, n, invalid=False):
+    records = []
+    for i in range(n):
+        records.append({
+            'id': i,
+            'name': 'record %d' % i,
+            'price': 'n/a' if invalid else rnd.random() * 100,
+            'tags': ['tag%d' % rnd.randint(0, 10) for _ in range(3)],
+            'active': bool(i % 2),
+        })
+    return records
+
+def _count(n, scale):
+    return max(1, int(n * scale))
+
+def benchmarks(scale=1.0, seed=42):
+    """
+    Returns the list of `Benchmark`s. `scale` changes the number and
+    size of the documents.
+    """
+    rnd = random.Random(seed)
+    result = []
+
+    spec, docs = _wide_dicts(rnd, scale)
+    result.append(Benchmark('wide_dict', spec, docs))
+
+    spec = recursive({required('name'): str, 'value': float, 'children': [recursive()]})
+    docs = [_deep(rnd, _count(50, scale)) for _ in range(_count(20, scale))]
+    result.append(Benchmark('deep_recursive', spec, docs))
+
+    docs = [[rnd.random() for _ in range(_count(100000, scale))] for _ in range(10)]
+    result.append(Benchmark('float_list', [float], docs))
+    docs = [['item%d' % i for i in range(_count(100000, scale))] for _ in range(10)]
+    result.append(Benchmark('str_list', [str], docs))
+
+    spec = [{required('id'): int, 'name': str, 'price': number(), 'tags': [str], 'active': bool}]
+    docs = [_records(rnd, _count(10000, scale)) for _ in range(5)]
+    result.append(Benchmark('records', spec, docs))
+    docs = [_records(rnd, _count(10000, scale), invalid=True) for _ in range(5)]
+    result.append(Benchmark('records_invalid', spec, docs, valid=False))
+    result.append(Benchmark('records_invalid_aggregate', spec, docs, valid=False, aggregate=True))
+
+    # one_of selects the alternative by the type of the data
+    values = [1, 1.5, 'foo', True, [1], {'a': 1}]
+    spec = [one_of(bool, int, float, str, [int], {required('a'): int})]
+    docs = [[values[rnd.randint(0, 5)] for _ in range(_count(20000, scale))] for _ in range(5)]
+    result.append(Benchmark('one_of', spec, docs))
+
+    specs = dict(('type%d' % i, {'value%d' % i: int, 'name': str}) for i in range(8))
+    spec = [type_spec('type', specs)]
+    docs = []
+    for _ in range(5):
+        doc = []
+        for _ in range(_count(10000, scale)):
+            i = rnd.randint(0, 7)
+            doc.append({'type': 'type%d' % i, 'value%d' % i: i, 'name': 'x'})
+        docs.append(doc)
+    result.append(Benchmark('type_spec', spec, docs))
+
+    spec = {anything(): {'x': float, 'y': float}}
+    docs = [dict(('k%d' % i, {'x': rnd.random(), 'y': 'invalid'}) for i in range(_count(20000, scale)))
+        for _ in range(5)]
+    result.append(Benchmark('invalid_map', spec, docs, valid=False))
+
+    return result
+
+def _validate_all(validator, docs, valid):
+    for doc in docs:
+        try:
+            validator.validate(doc)
+        except ValidationError:
+            if valid:
+                raise
+
+def run(benchmark, repeat=3):
+    """
+    Run `benchmark` and return a dict with the best ``seconds`` of
+    `repeat` runs, ``docs_per_s``, ``mb_per_s`` and ``peak_kb``.
+    """
+    validator = Validator(compile(benchmark.spec), **benchmark.options)
+    docs = benchmark.docs
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.time()
+        _validate_all(validator, docs, benchmark.valid)
+        seconds = time.time() - start
+        if best is None or seconds < best:
+            best = seconds
+    best = max(best, 1e-9)
+
+    peak_kb = None
+    if tracemalloc is not None:
+        # in an extra run, tracemalloc slows down the validation
+        tracemalloc.start()
+        try:
+            _validate_all(validator, docs, benchmark.valid)
+            peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'seconds': best,
+        'docs_per_s': len(docs) / best,
+        'mb_per_s': benchmark.size / best / 1e6,
+        'peak_kb': peak_kb,
+    }
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compare `results` with the `baseline` results. Returns a list of
+    ``(name, ratio, regression)`` tuples, where ratio is the throughput
+    in MB/s relative to the baseline.
+    """
+    comparison = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = result['mb_per_s'] / baseline[name]['mb_per_s']
+        comparison.append((name, ratio, ratio < 1 - tolerance))
+    return comparison
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options] [benchmark ...]')
+    parser.add_option('--scale', type='float', default=1.0,
+        help='size of the documents (default 1.0)')
+    parser.add_option('--repeat', type='int', default=3)
+    parser.add_option('--save', metavar='FILE', help='save results as JSON')
+    parser.add_option('--compare', metavar='FILE', help='compare with saved results')
+    parser.add_option('--tolerance', type='float', default=0.1,
+        help='allowed slowdown for --compare (default 0.1)')
+    options, names = parser.parse_args(argv)
+
+    results = {}
+    for benchmark in benchmarks(options.scale):
+        if names and benchmark.name not in names:
+            continue
+        result = run(benchmark, options.repeat)
+        results[benchmark.name] = result
+        print('%-26s %10.1f docs/s %8.1f MB/s %10s KB peak' % (benchmark.name,
+            result['docs_per_s'], result['mb_per_s'],
+            '-' if result['peak_kb'] is None else result['peak_kb']))
+
+    if options.save:
+        with open(options.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        print()
+        for name, ratio, regression in compare(results, baseline, options.tolerance):
+            print('%-26s %6.2fx%s' % (name, ratio, '  REGRESSION' if regression else ''))
+            regressions += regression
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+On-disk cache for compiled specs.
+
+Short-lived processes can load a compiled spec instead of compiling
+it again::
+
+    >>> cache = SpecCache('/var/cache/myapp')
+    >>> validator = Validator(cache.compile(spec))
+
+`SpecCache.get` can also load a compiled spec without building the spec
+first, with your own key::
+
+    >>> plan = cache.get('orders-v3', build_order_spec)
+
+`CompiledSpec` and `Validator` objects can also be pickled directly,
+e.g. to pass them to worker processes.
+"""
+
+from __future__ import absolute_import
+
+import errno
+import hashlib
+import os
+import sys
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from . import __version__
+from .compat import iteritems, string_type, numeric_types
+from .validator import compile, CompiledSpec
+
+def spec_hash(spec):
+    """
+    Hash of `spec` that is stable between processes.
+
+    Equal specs have the same hash. Custom spec classes are hashed by
+    their class and attributes. Attributes that are only identified by
+    their memory address (e.g. lambdas) result in different hashes for
+    each process.
+    """
+    parts = []
+    _canonical(spec, parts, set())
+    return hashlib.sha1(''.join(parts).encode('utf-8')).hexdigest()
+
+def _canonical(spec, parts, parents):
+    if isinstance(spec, (dict, list, tuple)) or hasattr(spec, '__dict__'):
+        if id(spec) in parents:
+            raise ValueError('spec contains itself')
+        parents.add(id(spec))
+
+    if isinstance(spec, dict):
+        items = []
+        for k, v in iteritems(spec):
+            key, value = [], []
+            _canonical(k, key, parents)
+            _canonical(v, value, parents)
+            items.append((''.join(key), ''.join(value)))
+        parts.append('{')
+        for k, v in sorted(items):
+            parts.extend((k, ':', v, ','))
+        parts.append('}')
+    elif isinstance(spec, (list, tuple)):
+        parts.append('[' if isinstance(spec, list) else '(')
+        for v in spec:
+            _canonical(v, parts, parents)
+            parts.append(',')
+        parts.append(']' if isinstance(spec, list) else ')')
+    elif isinstance(spec, type):
+        parts.append('<%s.%s>' % (spec.__module__, spec.__name__))
+    elif isinstance(spec, string_type) or isinstance(spec, numeric_types) or spec is None:
+        # also for required and default keys
+        parts.append('%s.%s:%r' % (type(spec).__module__, type(spec).__name__, spec))
+        if getattr(spec, '__dict__', None):
+            _canonical(vars(spec), parts, parents)
+    elif hasattr(spec, '__dict__') and not callable(spec):
+        # spec classes like one_of or type_spec
+        parts.append('%s.%s' % (type(spec).__module__, type(spec).__name__))
+        _canonical(vars(spec), parts, parents)
+    else:
+        parts.append(repr(spec))
+
+    parents.discard(id(spec))
+
+class SpecCache(object):
+    """
+    Directory with pickled `CompiledSpec`s.
+
+    The files are specific for the versions of Python and dictspec.
+    Unreadable files are replaced.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def compile(self, spec):
+        """
+        Return the `CompiledSpec` of `spec`, from the cache if possible.
+        """
+        if isinstance(spec, CompiledSpec):
+            return spec
+        return self.get(spec_hash(spec), lambda: spec)
+
+    def get(self, key, build):
+        """
+        Return the `CompiledSpec` for `key`. Calls `build` for the spec
+        and compiles it if it is not cached.
+        """
+        filename = self.filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # missing, incomplete or incompatible file
+            pass
+        compiled = compile(build())
+        self.store(key, compiled)
+        return compiled
+
+    def store(self, key, compiled):
+        if not os.path.exists(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError as ex:
+                if ex.errno != errno.EEXIST:
+                    raise
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(compiled, f, pickle.HIGHEST_PROTOCOL)
+            # other processes only see complete files
+            os.rename(tmp, self.filename(key))
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def filename(self, key):
+        return os.path.join(self.directory, 'dictspec-%s-py%d%d-%s.pickle' % (
+            __version__, sys.version_info[0], sys.version_info[1], key))
@@ -0,0 +1,373 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Validation of a document against multiple specs in a single pass,
+e.g. against the current and the next version of a spec.
+
+    >>> validator = MultiValidator([spec_v1, spec_v2])
+    >>> for result in validator.validate(data):
+    ...     print(result.index, result.valid, result.errors)
+
+Parts of the specs that are equal (e.g. unchanged between versions)
+are checked only once for all specs, as long as the data is valid.
+"""
+
+from __future__ import absolute_import
+
+from .compat import iteritems
+from .validator import (
+    Validator, ValidationError, ValidationResult, Context,
+    _ANYTHING, _COLUMNS_SIZE, _TypeNode, _DispatchNode, _DictNode, _ListNode, _OneOfNode, _TypeSpecNode,
+)
+from .spec import recursive
+
+def validate_specs(specs, data, **options):
+    """
+    Validate `data` against each spec of `specs`, see
+    `MultiValidator.validate`.
+    """
+    return MultiValidator(specs, **options).validate(data)
+
+class MultiValidator(object):
+    """
+    Validator for multiple specs.
+
+    `specs` is a list of specs, `CompiledSpec`s or `Validator`s (e.g.
+    with different options for each spec). The `options` are passed to
+    `Validator` for the other specs. The `sample` and `cache_size`
+    options are not used.
+    """
+    def __init__(self, specs, **options):
+        self.validators = [s if isinstance(s, Validator) else Validator(s, **options)
+            for s in specs]
+        # checks of equal nodes are only shared for the same options
+        self.shared = len(set((v.accept_arrays, v.max_depth) for v in self.validators)) == 1
+        self.canonical = _canonical_nodes([v.compiled_spec.root for v in self.validators])
+
+    def validate(self, data):
+        """
+        Validate `data` against all specs, with a single pass through
+        the data. Returns a `ValidationResult` for each spec, the
+        `index` is the position of the spec. Invalid data does not
+        raise.
+
+        A spec is no longer checked after it raised an error, e.g. with
+        `fail_fast` or `max_errors`. The pass ends after all specs
+        raised.
+        """
+        walk = _MultiWalk(self)
+        walk.walk(data)
+        results = []
+        for i, run in enumerate(walk.runs):
+            ex = walk.failed[i]
+            if ex is not None:
+                results.append(ValidationResult(i, data, ex.details,
+                    informal_only=ex.informal_only))
+            else:
+                results.append(ValidationResult(i, data, run.details(),
+                    informal_only=not run.errors))
+        return results
+
+class _MultiWalk(object):
+    """
+    Walks the data like `_walk`, with a list of (spec index, node) pairs
+    for each value. All runs share the `Context`, the position in the
+    data is the same for all specs.
+
+    Values with the same (canonical) node for all specs are checked
+    with `check` of the node, see `check_nodes`.
+    """
+    def __init__(self, validator):
+        self.context = Context()
+        self.canonical = validator.canonical
+        self.shared = validator.shared
+        self.roots = []
+        self.runs = []
+        for i, v in enumerate(validator.validators):
+            run = v._new_run()
+            run.context = self.context
+            run.sampler = run.memo = None
+            self.runs.append(run)
+            self.roots.append((i, self.canonical.get(id(v.compiled_spec.root),
+                v.compiled_spec.root)))
+        # ValidationError of each raised run
+        self.failed = [None] * len(self.runs)
+        self.alive = len(self.runs)
+
+    def fail(self, i, ex, size):
+        self.failed[i] = ex
+        self.alive -= 1
+        # positions of the aborted check
+        del self.context.obj_pos[size:]
+
+    def walk(self, data):
+        obj_pos = self.context.obj_pos
+        frames = []
+        items = self.check(self.roots, data, 0)
+        if items is not None:
+            frames.append(items)
+        while frames and self.alive:
+            for key, pairs, value in frames[-1]:
+                break
+            else:
+                frames.pop()
+                if frames:
+                    obj_pos.pop()
+                continue
+
+            obj_pos.append(key)
+            items = self.check(pairs, value, len(frames))
+            if items is not None:
+                frames.append(items)
+                continue
+            obj_pos.pop()
+
+    def same(self, pairs):
+        # True if all pairs have the same node
+        if len(pairs) == 1:
+            return True
+        if not self.shared:
+            return False
+        node = pairs[0][1]
+        for _, other in pairs:
+            if other is not node:
+                return False
+        return True
+
+    def check_nodes(self, pairs, data, depth):
+        """
+        Check `data` with the node of each pair. Equal nodes are only
+        checked until a check reports nothing, the data is then valid
+        for the other specs as well.
+        """
+        same = self.same(pairs)
+        failed = self.failed
+        size = len(self.context.obj_pos)
+        for i, node in pairs:
+            if failed[i] is not None:
+                continue
+            run = self.runs[i]
+            count = run.count
+            run.depth = depth
+            try:
+                node.check(data, run)
+            except ValidationError as ex:
+                self.fail(i, ex, size)
+                continue
+            if same and run.count == count:
+                return
+
+    def check(self, pairs, data, depth):
+        """
+        Check `data` for each (index, node) of `pairs`, without the
+        values or items of different nodes. Returns an iterator of
+        (key, pairs, value) for the values or items that need to be
+        checked, or None.
+        """
+        if self.same(pairs) or not isinstance(data, (dict, list)):
+            self.check_nodes(pairs, data, depth)
+            return None
+        dicts = []
+        lists = []
+        # (index, row_values) of lists that passed column_keys
+        rows = []
+        failed = self.failed
+        size = len(self.context.obj_pos)
+        for i, node in pairs:
+            if failed[i] is not None:
+                continue
+            run = self.runs[i]
+            try:
+                while isinstance(node, _DispatchNode):
+                    node = node.select(data, run)
+                    if node is None:
+                        break
+                if node is None or node is _ANYTHING:
+                    continue
+                if isinstance(node, (_DictNode, _ListNode)):
+                    if not node.check_head(data, run):
+                        continue
+                    if run.max_depth and depth >= run.max_depth and isinstance(data, (dict, list)):
+                        run.report('depth', node, data, key=run.max_depth)
+                    elif isinstance(node, _DictNode):
+                        if data and node.any_key is not _ANYTHING:
+                            dicts.append((i, node))
+                    elif not node.check_bulk(data):
+                        keys = None
+                        if (node.columns is not None and len(data) >= _COLUMNS_SIZE
+                            and not (run.max_depth and depth + 1 >= run.max_depth)):
+                            keys = node.column_keys(data)
+                        if keys is None:
+                            lists.append((i, self.canonical.get(id(node.item), node.item)))
+                        elif keys.intersection(node.row_values):
+                            rows.append((i, node.row_values))
+                else:
+                    node.check(data, run)
+            except ValidationError as ex:
+                self.fail(i, ex, size)
+        if dicts:
+            return self.dict_items(dicts, data, depth + 1)
+        if lists or rows:
+            return self.list_items(lists, rows, data, depth + 1)
+        return None
+
+    def dict_items(self, dicts, data, depth):
+        failed = self.failed
+        runs = self.runs
+        canonical = self.canonical
+        obj_pos = self.context.obj_pos
+        for k, value in iteritems(data):
+            pairs = []
+            for i, node in dicts:
+                if failed[i] is not None:
+                    continue
+                try:
+                    child = node.child(k, runs[i])
+                except ValidationError as ex:
+                    self.fail(i, ex, len(obj_pos))
+                    continue
+                if child is not None and child is not _ANYTHING:
+                    pairs.append((i, canonical.get(id(child), child)))
+            if not pairs:
+                continue
+            if isinstance(value, (dict, list)):
+                yield k, pairs, value
+            else:
+                obj_pos.append(k)
+                self.check_nodes(pairs, value, depth)
+                obj_pos.pop()
+
+    def list_items(self, pairs, rows, data, depth):
+        obj_pos = self.context.obj_pos
+        # a single index cell for all items, see Context
+        index = [0]
+        for i, value in enumerate(data):
+            index[0] = i
+            if rows:
+                obj_pos.append(index)
+                self.check_row(rows, value, depth + 1)
+                obj_pos.pop()
+            if not pairs:
+                continue
+            if isinstance(value, (dict, list)):
+                yield index, pairs, value
+            else:
+                obj_pos.append(index)
+                self.check_nodes(pairs, value, depth)
+                obj_pos.pop()
+
+    def check_row(self, rows, data, depth):
+        # check the values of a dict with the row_values, see check_columns
+        failed = self.failed
+        canonical = self.canonical
+        obj_pos = self.context.obj_pos
+        for k, value in iteritems(data):
+            pairs = []
+            for i, row_values in rows:
+                if failed[i] is None:
+                    node = row_values.get(k)
+                    if node is not None:
+                        pairs.append((i, canonical.get(id(node), node)))
+            if pairs:
+                obj_pos.append(k)
+                self.check_nodes(pairs, value, depth)
+                obj_pos.pop()
+
+def _canonical_nodes(roots):
+    """
+    Map the ids of the nodes of all `roots` to the first node with an
+    equal signature. Equal nodes report the same messages for the
+    same data.
+    """
+    signatures = {}
+    canonical = {}
+    first = {}
+    for root in roots:
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            if id(node) in canonical:
+                continue
+            sig = _signature(node, signatures)
+            canonical[id(node)] = first.setdefault(sig, node)
+            pending.extend(_children(node))
+    return canonical
+
+def _children(node):
+    if type(node) is _DictNode:
+        children = list(node.values.values())
+        if node.any_key is not None:
+            children.append(node.any_key)
+        return children
+    if type(node) is _ListNode:
+        return [node.item] if node.item is not None else []
+    if type(node) is _OneOfNode:
+        return [n for _, n in node.alternatives]
+    if type(node) is _TypeSpecNode:
+        return list(node.dispatch.values())
+    return []
+
+def _signature(node, signatures):
+    """
+    Hashable signature of `node` and its children. Nodes that depend
+    on a recursion scope, custom specs and profiled nodes get a unique
+    signature.
+    """
+    key = id(node)
+    if key in signatures:
+        return signatures[key]
+    # unique, also for cycles
+    signatures[key] = sig = ('node', key)
+    if node is _ANYTHING:
+        sig = 'anything'
+    elif 'check' in node.__dict__:
+        # profiled
+        pass
+    elif type(node) is _TypeNode:
+        sig = _type_signature(node)
+    elif type(node) is _DictNode:
+        sig = ('dict', _type_signature(node), tuple(node.required),
+            tuple(k for k, _ in node.defaults),
+            None if node.any_key is None else _signature(node.any_key, signatures),
+            frozenset((k, _signature(v, signatures)) for k, v in iteritems(node.values)))
+    elif type(node) is _ListNode:
+        sig = ('list', _type_signature(node),
+            None if node.item is None else _signature(node.item, signatures))
+    elif type(node) is _OneOfNode:
+        sig = ('one_of', node.type_names, tuple((_type_signature(t), _signature(n, signatures))
+            for t, n in node.alternatives))
+    elif type(node) is _TypeSpecNode:
+        sig = ('type_spec', node.type_key,
+            frozenset((k, _signature(n, signatures)) for k, n in iteritems(node.dispatch)))
+    signatures[key] = sig
+    return sig
+
+def _type_signature(node):
+    compare = node.compare_type
+    if compare is not None:
+        spec = compare.__self__
+        if type(spec) is recursive:
+            compare = ('recursive', type(spec.spec))
+        elif node.static:
+            compare = type(spec)
+        else:
+            compare = ('custom', id(spec))
+    return (node.type_name, node.types, compare)
@@ -0,0 +1,158 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Validation of newline-delimited JSON (JSON lines) files with multiple
+processes.
+"""
+
+from __future__ import absolute_import
+
+import json
+import mmap
+import multiprocessing
+
+from .validator import compile, CompiledSpec, ValidationError, ValidationResult, _Run, _text
+
+def validate_lines(spec, filename, processes=None, chunk_size=16*1024*1024,
+    all_lines=False, fail_fast=False):
+    """
+    Validate each line of the NDJSON file `filename` against `spec`.
+
+    The file is split into chunks of about `chunk_size` bytes, which are
+    validated by a pool of `processes` worker processes (defaults to the
+    number of CPUs). The workers read their chunk from a memory-mapped
+    file. With ``processes=1`` all lines are validated in this process.
+
+    Returns an iterator of `ValidationResult` in file order, with the
+    line number (starting at 1) as `index` and without `data`. Only
+    lines with errors are returned, unless `all_lines` is True.
+    Empty lines are ignored, lines with invalid JSON are errors.
+    """
+    if isinstance(spec, CompiledSpec):
+        spec = spec.spec
+    with open(filename, 'rb') as f:
+        chunks = _chunks(f, chunk_size)
+    if not chunks:
+        return
+
+    if processes == 1:
+        _init_worker(spec, filename, all_lines, fail_fast)
+        try:
+            for result in _line_results(_map(_validate_chunk, chunks)):
+                yield result
+        finally:
+            _close_worker()
+        return
+
+    pool = multiprocessing.Pool(processes, _init_worker, (spec, filename, all_lines, fail_fast))
+    try:
+        for result in _line_results(pool.imap(_validate_chunk, chunks)):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def _map(func, iterable):
+    for item in iterable:
+        yield func(item)
+
+def _line_results(chunk_results):
+    lineno = 1
+    for num_lines, results in chunk_results:
+        for offset, errors, informal_only in results:
+            yield ValidationResult(lineno + offset, None, errors, informal_only=informal_only)
+        lineno += num_lines
+
+def _chunks(f, chunk_size):
+    """
+    (start, end) byte ranges of `f`, split after a newline.
+    """
+    f.seek(0, 2)
+    size = f.tell()
+    if not size:
+        return []
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        chunks = []
+        start = 0
+        while start < size:
+            end = mm.find(b'\n', min(start + chunk_size, size) - 1)
+            end = size if end == -1 else end + 1
+            chunks.append((start, end))
+            start = end
+        return chunks
+    finally:
+        mm.close()
+
+# state of the worker process
+_worker = {}
+
+def _init_worker(spec, filename, all_lines, fail_fast):
+    f = open(filename, 'rb')
+    _worker['file'] = f
+    _worker['mmap'] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker['root'] = compile(spec).root
+    _worker['all_lines'] = all_lines
+    _worker['fail_fast'] = fail_fast
+
+def _close_worker():
+    _worker.pop('mmap').close()
+    _worker.pop('file').close()
+
+def _validate_chunk(chunk):
+    """
+    Validate all lines between the byte offsets `chunk`.
+    Returns the number of lines and (line offset, errors, informal_only)
+    for each reported line.
+    """
+    start, end = chunk
+    mm = _worker['mmap']
+    root = _worker['root']
+    all_lines = _worker['all_lines']
+    fail_fast = _worker['fail_fast']
+    results = []
+    offset = 0
+    pos = start
+    while pos < end:
+        nl = mm.find(b'\n', pos, end)
+        if nl == -1:
+            nl = end
+        line = mm[pos:nl]
+        pos = nl + 1
+        if line.strip():
+            run = _Run(fail_fast)
+            try:
+                data = json.loads(line.decode('utf-8'))
+            except ValueError as ex:
+                results.append((offset, ['invalid JSON: %s' % ex], False))
+            else:
+                try:
+                    root.check(data, run)
+                except ValidationError as ex:
+                    results.append((offset, ex.errors, ex.informal_only))
+                else:
+                    if run.messages or all_lines:
+                        results.append((offset, [_text(m) for m in run.messages], not run.errors))
+        elif all_lines:
+            results.append((offset, [], True))
+        offset += 1
+    return offset, results
@@ -0,0 +1,186 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Static analysis and simplification of specs.
+
+    >>> from dictspec.optimize import analyze, optimize
+    >>> for problem in analyze(spec):
+    ...     print(problem)
+    >>> validator = Validator(optimize(spec))
+
+Positions in the spec are shown like in `dictspec.profiling`: ``[*]``
+for list items, ``<type>`` for one_of alternatives and ``<key=value>``
+for type_spec specs.
+"""
+
+from __future__ import absolute_import
+
+from .compat import iteritems
+from .spec import anything, number, number_types, one_of, recursive, required, default, type_spec
+from .validator import type_str
+
+def optimize(spec):
+    """
+    Return a spec that accepts the same data as `spec`, but is cheaper
+    to compile and to validate:
+
+    - one_of alternatives that are never selected (e.g. ``int`` after
+      ``anything()``, ``float`` after ``number()``, duplicates or
+      nested one_of specs, which are compared as a type) are removed
+    - one_of specs with a single alternative are replaced by it
+    - values of dict keys that are ignored because of an `anything`
+      key are removed
+
+    Messages for invalid data can differ. `spec` is not changed.
+    """
+    return _Optimizer().rewrite(spec, '', False)
+
+def analyze(spec):
+    """
+    List of problems in `spec`, e.g. list specs with more than one type
+    or `recursive` outside of a recursive spec, which otherwise raise
+    `SpecError` during the validation, or unreachable alternatives.
+    """
+    optimizer = _Optimizer()
+    optimizer.rewrite(spec, '', False)
+    return optimizer.problems
+
+class _Optimizer(object):
+    def __init__(self):
+        self.problems = []
+
+    def problem(self, msg, path):
+        self.problems.append('%s in %s' % (msg, path.lstrip('.') or '.'))
+
+    def rewrite(self, spec, path, recursion):
+        if isinstance(spec, type_spec):
+            if type(spec) is not type_spec:
+                return spec
+            return type_spec(spec.type_key, dict(
+                (k, self.rewrite(s, '%s<%s=%s>' % (path, spec.type_key, k), recursion))
+                for k, s in iteritems(spec.specs)))
+        if hasattr(spec, 'subspec'):
+            return spec
+        if isinstance(spec, recursive):
+            if not spec.spec:
+                if not recursion:
+                    self.problem('recursive() outside recursive spec', path)
+                return spec
+            if type(spec) is not recursive:
+                return spec
+            result = self.rewrite(spec.spec, path, True)
+            if not result or type(result) is not type(spec.spec):
+                # recursive({}) is recursive(), and compare_type
+                # depends on the type of the spec
+                return spec
+            return recursive(result)
+        if isinstance(spec, one_of):
+            return self.rewrite_one_of(spec, path, recursion)
+        if type(spec) is dict:
+            return self.rewrite_dict(spec, path, recursion)
+        if type(spec) is list:
+            if len(spec) != 1:
+                self.problem('list spec with %d types' % len(spec), path)
+                return spec
+            return [self.rewrite(spec[0], path + '[*]', recursion)]
+        return spec
+
+    def rewrite_dict(self, spec, path, recursion):
+        any_key = None
+        for k in spec:
+            if isinstance(k, anything):
+                any_key = k
+        result = {}
+        ignored = []
+        for k, v in iteritems(spec):
+            if any_key is None or k is any_key:
+                result[k] = self.rewrite(v, '%s.%s' % (path, '*' if k is any_key else k), recursion)
+            else:
+                if not isinstance(v, anything):
+                    ignored.append(k)
+                if isinstance(k, (required, default)):
+                    # only the key is used
+                    result[k] = anything()
+        if ignored:
+            self.problem('%s checked with the value of anything()' % ', '.join(
+                map(repr, sorted(ignored))), path)
+        return result
+
+    def rewrite_one_of(self, spec, path, recursion):
+        specs = []
+        for s in spec.specs:
+            alt_path = '%s<%s>' % (path, type_str(s))
+            if isinstance(s, one_of):
+                self.problem('nested one_of never selected', alt_path)
+                continue
+            specs.append(self.rewrite(s, alt_path, recursion))
+        result = []
+        for s in specs:
+            alt_path = '%s<%s>' % (path, type_str(s))
+            if hasattr(s, 'subspec'):
+                self.problem('%s never selected' % type_str(s), alt_path)
+            for other in result:
+                if _subsumes(_matcher(other), _matcher(s)):
+                    self.problem('unreachable alternative, %s matches first' % type_str(other),
+                        alt_path)
+                    break
+            else:
+                result.append(s)
+        if len(result) == 1 and not hasattr(result[0], 'subspec') and (
+            not isinstance(result[0], recursive)):
+            return result[0]
+        return one_of(*result)
+
+# matches all data
+_ALL = 'all'
+# matches numbers, see number.compare_type
+_NUMBER = 'number'
+
+def _matcher(spec):
+    """
+    Data that is matched by `spec` as a one_of alternative: _ALL,
+    _NUMBER, a type (matches its instances) or None (unknown, e.g.
+    custom compare_type).
+    """
+    if type(spec) is anything:
+        return _ALL
+    if type(spec) is number:
+        return _NUMBER
+    if hasattr(spec, 'compare_type'):
+        return None
+    if isinstance(spec, type):
+        return spec
+    return type(spec)
+
+def _subsumes(a, b):
+    # True if a matches all data that is matched by b
+    if a == _ALL:
+        return True
+    if a is None or b is None or b == _ALL:
+        return False
+    if a == _NUMBER:
+        if b == _NUMBER:
+            return True
+        # bool is an int, but no number
+        return issubclass(b, number_types) and not issubclass(bool, b)
+    if b == _NUMBER:
+        return all(issubclass(t, a) for t in number_types)
+    return issubclass(b, a)
@@ -0,0 +1,230 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Validation of changes to documents that are known to be valid.
+"""
+
+from __future__ import absolute_import
+
+from .compat import string_type
+from .validator import (
+    Validator,
+    _DispatchNode, _SubspecNode, _TypeSpecNode, _DictNode, _ListNode, _AnythingNode,
+)
+
+def validate_changes(spec, doc, changes, **options):
+    """
+    Validate the parts of `doc` that were changed by `changes`.
+
+    `doc` is the changed document and it needs to be valid before the
+    changes. `changes` is a list of JSON Patch operations (dicts with
+    ``op``, ``path`` and ``from``) or of the changed paths, as JSON
+    pointers (``'/foo/0/bar'``) or as lists of keys and indices.
+
+    Only the changed values and the required keys of their parent dicts
+    are checked. Dicts of a `type_spec` are checked completely if their
+    type key changed. Lists are checked completely if an operation adds
+    or removes items after an earlier operation changed items of the
+    list, since the earlier paths refer to the list before the change.
+
+    `spec` can be a spec, a `CompiledSpec` or a `Validator`, the
+    `options` are passed to `Validator`. Raises `ValidationError` like
+    `Validator.validate`.
+    """
+    if not isinstance(spec, Validator):
+        spec = Validator(spec, **options)
+    root = spec.compiled_spec.root
+    run = spec._new_run()
+    # ids of the dicts with checked required keys
+    checked = set()
+    for path in _changed_paths(changes, doc):
+        _check_path(root, doc, path, run, checked)
+        del run.context.obj_pos[:]
+        run.depth = 0
+    run.raise_errors()
+
+def _changed_paths(changes, doc):
+    """
+    Paths in `doc` to check for `changes`. Paths that might be moved by
+    a later operation (e.g. items after an added list item) are
+    replaced by the path of their list.
+    """
+    # (path, step), a move is a remove and an add step
+    paths = []
+    # (path, step, appended) of lists or dicts with added or removed values
+    parents = []
+    for i, change in enumerate(changes):
+        step = 2 * i + 1
+        if isinstance(change, dict):
+            op = change['op']
+            if op == 'test':
+                continue
+            path = parse_pointer(change['path'])
+            if op == 'move':
+                source = parse_pointer(change['from'])
+                paths.append((source, step - 1))
+                if source:
+                    parents.append((source[:-1], step - 1, False))
+            if op in ('add', 'remove', 'move', 'copy') and path:
+                parents.append((path[:-1], step, path[-1] == '-'))
+        elif isinstance(change, string_type):
+            path = parse_pointer(change)
+        else:
+            path = list(change)
+        paths.append((path, step))
+    # last steps that added or removed items and that appended items, of
+    # each list (values of dicts are not moved by added or removed keys)
+    moved = {}
+    for parent, step, appended in parents:
+        if not isinstance(_resolve(doc, parent), dict):
+            moved.setdefault(tuple(parent), [0, 0])[1 if appended else 0] = step
+    result = []
+    for path, step in paths:
+        keys = tuple(str(k) if isinstance(k, int) else k for k in path)
+        for i in range(len(keys)):
+            last = moved.get(keys[:i])
+            # appended items only move the last item ('-')
+            if last is not None and (last[0] > step or (last[1] > step and keys[i] == '-')):
+                path = path[:i]
+                keys = keys[:i]
+                break
+        if '-' in keys:
+            keys = tuple(_last_items(doc, keys))
+        result.append((path, keys))
+    changed = set(keys for path, keys in result)
+    seen = set()
+    for path, keys in result:
+        # the values of a changed value are checked with it
+        if keys not in seen and not any(keys[:i] in changed for i in range(len(keys))):
+            seen.add(keys)
+            yield path
+
+def parse_pointer(pointer):
+    """
+    Keys of the JSON pointer `pointer`.
+
+    >>> parse_pointer('/foo/0/a~1b')
+    ['foo', '0', 'a/b']
+    """
+    if not pointer:
+        return []
+    if not pointer.startswith('/'):
+        raise ValueError('invalid JSON pointer %r' % pointer)
+    return [k.replace('~1', '/').replace('~0', '~') for k in pointer[1:].split('/')]
+
+def _check_path(node, data, path, run, checked):
+    obj_pos = run.context.obj_pos
+    for depth, key in enumerate(path):
+        last = depth == len(path) - 1
+        resolved = node
+        while isinstance(resolved, _DispatchNode):
+            if isinstance(resolved, _SubspecNode) or (
+                last and isinstance(resolved, _TypeSpecNode) and key == resolved.type_key):
+                # the selected spec might depend on the change
+                return node.check(data, run)
+            resolved = resolved.select(data, run)
+            if resolved is None:
+                return
+
+        if isinstance(resolved, _AnythingNode):
+            return
+        if isinstance(resolved, _DictNode) and isinstance(data, dict):
+            if last:
+                # required keys might be removed
+                if id(data) not in checked:
+                    checked.add(id(data))
+                    resolved.check_head(data, run)
+                if key not in data:
+                    return
+                node = resolved.child(key, run)
+            else:
+                if key not in data:
+                    # removed by a later change
+                    return
+                node = resolved.any_key
+                if node is None:
+                    node = resolved.values.get(key)
+            if node is None:
+                # unknown key
+                return
+            obj_pos.append(key)
+            run.depth += 1
+            data = data[key]
+        elif isinstance(resolved, _ListNode) and isinstance(data, list):
+            resolved.check_head(data, run)
+            index = _index(key, data)
+            if index is None:
+                # removed item
+                return
+            obj_pos.append([index])
+            run.depth += 1
+            node = resolved.item
+            data = data[index]
+        else:
+            # changed type of a parent value
+            return node.check(data, run)
+    node.check(data, run)
+
+def _resolve(data, path):
+    # value at `path` in `data`, or None
+    for key in path:
+        if isinstance(data, dict):
+            if key not in data:
+                return None
+            data = data[key]
+        elif isinstance(data, list):
+            index = _index(key, data)
+            if index is None:
+                return None
+            data = data[index]
+        else:
+            return None
+    return data
+
+def _last_items(data, keys):
+    # `keys` with the indices of the last items instead of '-'
+    result = []
+    for key in keys:
+        if isinstance(data, dict):
+            data = data.get(key)
+        elif isinstance(data, list):
+            index = _index(key, data)
+            if index is None:
+                data = None
+            else:
+                data = data[index]
+                if key == '-':
+                    key = str(index)
+        result.append(key)
+    return result
+
+def _index(key, data):
+    # index of the item `key` (e.g. '0' or '-') of the list `data`, or None
+    if key == '-':
+        index = len(data) - 1
+    else:
+        try:
+            index = int(key)
+        except ValueError:
+            return None
+    if 0 <= index < len(data):
+        return index
+    return None
@@ -0,0 +1,188 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Profiling of the validation for each node of a spec.
+
+    >>> from dictspec.validator import Validator
+    >>> profiler = Profiler()
+    >>> validator = Validator(spec, profiler=profiler)
+    >>> validator.validate(data)
+    >>> print(profiler.report())
+
+The `Validator` then uses its own copy of the compiled spec, where each
+node records its checks. Validators without a profiler are not affected.
+"""
+
+from __future__ import absolute_import
+
+from timeit import default_timer
+
+from .validator import (
+    compile, CompiledSpec, type_str,
+    _ANYTHING, _TypeNode, _DictNode, _ListNode, _OneOfNode, _TypeSpecNode,
+    _SubspecNode, _RecursionNode, _SpecErrorNode,
+)
+
+class NodeStats(object):
+    """
+    Statistics of a spec node.
+
+    :attr path: position of the node in the spec, ``[*]`` for list
+        items, ``<type>`` for one_of alternatives and ``<key=value>``
+        for type_spec specs
+    :attr kind: the type of the node, e.g. ``dict``, ``int`` or ``one_of``
+    :attr calls: number of checked values
+    :attr time: seconds spent in this node, including the child nodes
+    :attr own_time: seconds spent in this node, without the child nodes
+    :attr errors: number of errors and infos reported by this node
+    """
+    def __init__(self, node, path, kind):
+        self.node = node
+        self.path = path
+        self.kind = kind
+        self.calls = 0
+        self.time = 0.0
+        self.own_time = 0.0
+        self.errors = 0
+
+    def __repr__(self):
+        return '<NodeStats %s (%s): %d calls, %.6fs>' % (self.path, self.kind,
+            self.calls, self.own_time)
+
+class Profiler(object):
+    """
+    Collects `NodeStats` for validators created with this profiler.
+
+    `callback` is called after each check of a node with the `NodeStats`,
+    the seconds and the number of errors of this check, e.g. to send
+    metrics to other systems.
+
+    Values of lists that are checked by their types (e.g. ``[float]``)
+    are not counted for the item node. Nodes of custom `subspec` specs
+    are included in the time of the spec.
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._stats = []
+
+    def instrument(self, spec):
+        """
+        Return a new `CompiledSpec` for `spec` with profiled nodes.
+        """
+        if isinstance(spec, CompiledSpec):
+            spec = spec.spec
+        compiled = compile(spec)
+        seen = set()
+        pending = [(compiled.root, '')]
+        while pending:
+            node, path = pending.pop()
+            if node is _ANYTHING or id(node) in seen:
+                continue
+            seen.add(id(node))
+            stats = NodeStats(node, path.lstrip('.') or '.', _kind(node))
+            self._stats.append(stats)
+            node.check = self._wrap(node.check, stats)
+            if isinstance(node, _ListNode):
+                # check each item, to count the checks of the dict values
+                node.columns = None
+            for suffix, child in reversed(_children(node)):
+                pending.append((child, path + suffix))
+        return compiled
+
+    def _wrap(self, check, stats):
+        callback = self.callback
+        def profiled_check(data, run):
+            stack = run.profile_stack
+            # time and errors of the child nodes
+            frame = [0.0, 0]
+            stack.append(frame)
+            count = run.count
+            start = default_timer()
+            try:
+                check(data, run)
+            finally:
+                elapsed = default_timer() - start
+                errors = run.count - count
+                stack.pop()
+                if stack:
+                    stack[-1][0] += elapsed
+                    stack[-1][1] += errors
+                stats.calls += 1
+                stats.time += elapsed
+                stats.own_time += elapsed - frame[0]
+                stats.errors += errors - frame[1]
+                if callback is not None:
+                    callback(stats, elapsed, errors - frame[1])
+        return profiled_check
+
+    def stats(self):
+        """
+        `NodeStats` of all nodes, the slowest (by `own_time`) first.
+        """
+        return sorted(self._stats, key=lambda s: s.own_time, reverse=True)
+
+    def reset(self):
+        for s in self._stats:
+            s.calls = s.errors = 0
+            s.time = s.own_time = 0.0
+
+    def report(self, limit=20):
+        """
+        Table of the `limit` slowest nodes.
+        """
+        lines = ['%-40s %-12s %10s %10s %10s %8s' % (
+            'path', 'kind', 'calls', 'own time', 'time', 'errors')]
+        for s in self.stats()[:limit]:
+            lines.append('%-40s %-12s %10d %10.6f %10.6f %8d' % (
+                s.path, s.kind, s.calls, s.own_time, s.time, s.errors))
+        return '\n'.join(lines)
+
+def _kind(node):
+    if isinstance(node, _TypeNode):
+        return node.type_name
+    if isinstance(node, _OneOfNode):
+        return 'one_of'
+    if isinstance(node, _TypeSpecNode):
+        return 'type_spec'
+    if isinstance(node, _SubspecNode):
+        return type_str(node.spec)
+    if isinstance(node, _RecursionNode):
+        return 'recursive'
+    if isinstance(node, _SpecErrorNode):
+        return 'error'
+    return type(node).__name__
+
+def _children(node):
+    """
+    List of (path suffix, node) for the child nodes of `node`.
+    """
+    if isinstance(node, _DictNode):
+        children = [('.%s' % (k, ), v) for k, v in node.values.items()]
+        if node.any_key is not None:
+            children.append(('.*', node.any_key))
+        return children
+    if isinstance(node, _ListNode):
+        return [('[*]', node.item)] if node.item is not None else []
+    if isinstance(node, _OneOfNode):
+        return [('<%s>' % t.type_name, n) for t, n in node.alternatives]
+    if isinstance(node, _TypeSpecNode):
+        return [('<%s=%s>' % (node.type_key, k), n) for k, n in node.dispatch.items()]
+    return []
@@ -34,6 +34,20 @@ class required(str):
     """
     pass
 
+class default(str):
+    """
+    Mark a dictionary key as optional with a default value for
+    `Validator.extract`.
+
+    >>> from .validator import extract
+    >>> extract({default('port', 80): int}, {})
+    {'port': 80}
+    """
+    def __new__(cls, key, value=None):
+        self = str.__new__(cls, key)
+        self.value = value
+        return self
+
 class anything(object):
     """
     Wildcard key or value for dictionaries.
@@ -0,0 +1,259 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Validation of JSON documents while they are parsed.
+
+The document is never loaded as a whole. Memory is bounded by the
+nesting depth, with the exception of values for `type_spec`, custom
+`subspec` specs and `one_of` specs with custom `compare_type` specs.
+These values are loaded (only the value itself, not the whole document)
+and validated with the normal `Validator`.
+
+Errors for dicts and lists with the wrong type show ``{...}`` and
+``[...]`` instead of the actual data. Missing required keys are reported
+when the end of the dict is reached.
+"""
+
+from __future__ import absolute_import
+
+from .validator import (
+    compile, CompiledSpec, _Run,
+    _AnythingNode, _RecursionNode, _TypeNode, _DictNode, _ListNode, _OneOfNode,
+)
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+def validate_file(spec, fp, fail_fast=False):
+    """
+    Validate the JSON document from the binary file object `fp`
+    against `spec`. Requires ijson.
+
+    With `fail_fast`, reading stops at the first error.
+    """
+    if ijson is None:
+        raise ImportError('validate_file requires ijson')
+    return validate_events(spec, ijson.basic_parse(fp, use_float=True), fail_fast=fail_fast)
+
+def validate_events(spec, events, fail_fast=False):
+    """
+    Validate a document from the parser `events` against `spec`.
+
+    `events` is an iterable of ``(event, value)`` tuples, as returned by
+    ``ijson.basic_parse``: ``start_map``, ``map_key``, ``end_map``,
+    ``start_array``, ``end_array`` and scalar events (``string``,
+    ``number``, ``boolean``, ``null``, etc.) with their value.
+    """
+    if not isinstance(spec, CompiledSpec):
+        spec = compile(spec)
+    run = _Run(fail_fast)
+    walker = _EventWalker(spec.root, run)
+    for event, value in events:
+        walker.feed(event, value)
+    run.raise_errors()
+
+_START = {'start_map': dict, 'start_array': list}
+_END = frozenset(['end_map', 'end_array'])
+
+class _DictFrame(object):
+    def __init__(self, node):
+        self.node = node
+        self.seen = set()
+        self.child = None
+        self.pushed = False
+
+class _ListFrame(object):
+    def __init__(self, node, index):
+        self.node = node
+        self.index = index
+
+class _Skip(object):
+    # skips a container value
+    def __init__(self):
+        self.depth = 1
+
+    def feed(self, event, value):
+        if event in _START:
+            self.depth += 1
+        elif event in _END:
+            self.depth -= 1
+            return not self.depth
+        return False
+
+class _Builder(object):
+    # loads a container value for the normal validator
+    def __init__(self, node, container):
+        self.node = node
+        self.value = container
+        self.stack = [container]
+        self.keys = [None]
+
+    def feed(self, event, value):
+        if event == 'map_key':
+            self.keys[-1] = value
+            return False
+        if event in _END:
+            self.stack.pop()
+            self.keys.pop()
+            return not self.stack
+        if event in _START:
+            value = _START[event]()
+            self.add(value)
+            self.stack.append(value)
+            self.keys.append(None)
+            return False
+        self.add(value)
+        return False
+
+    def add(self, value):
+        parent = self.stack[-1]
+        if isinstance(parent, list):
+            parent.append(value)
+        else:
+            parent[self.keys[-1]] = value
+
+class _EventWalker(object):
+    def __init__(self, root, run):
+        self.root = root
+        self.run = run
+        self.obj_pos = run.context.obj_pos
+        self.frames = []
+
+    def feed(self, event, value):
+        frames = self.frames
+        if not frames:
+            if self.root is None:
+                return
+            node = self.root
+            self.root = None
+        else:
+            frame = frames[-1]
+            if isinstance(frame, (_Skip, _Builder)):
+                if frame.feed(event, value):
+                    frames.pop()
+                    if isinstance(frame, _Builder):
+                        frame.node.check(frame.value, self.run)
+                    self.value_done()
+                return
+            if isinstance(frame, _DictFrame):
+                if event == 'map_key':
+                    return self.map_key(frame, value)
+                if event == 'end_map':
+                    return self.end_map(frame)
+                node = frame.child
+            else:
+                if event == 'end_array':
+                    frames.pop()
+                    self.obj_pos.pop()
+                    return self.value_done()
+                node = frame.node
+
+        if event in _START:
+            self.start_container(node, event)
+        else:
+            if node is not None:
+                node.check(value, self.run)
+            self.value_done()
+
+    def map_key(self, frame, key):
+        node = frame.node
+        if key in node.required:
+            frame.seen.add(key)
+        frame.child = node.child(key, self.run)
+        if frame.child is None:
+            frame.pushed = False
+            return
+        self.obj_pos.append(key)
+        frame.pushed = True
+
+    def end_map(self, frame):
+        for k in frame.node.required:
+            if k not in frame.seen:
+                self.run.report('missing', frame.node, key=k)
+        self.frames.pop()
+        self.value_done()
+
+    def value_done(self):
+        if not self.frames:
+            return
+        frame = self.frames[-1]
+        if isinstance(frame, _DictFrame):
+            if frame.pushed:
+                self.obj_pos.pop()
+                frame.pushed = False
+        else:
+            frame.index[0] += 1
+
+    def start_container(self, node, event):
+        container = _START[event]()
+        if node is None:
+            # value of an unknown key
+            self.frames.append(_Skip())
+            return
+        while True:
+            while isinstance(node, _RecursionNode):
+                node = node.scope.node
+            if not isinstance(node, _OneOfNode):
+                break
+            if not all(t.static for t, _ in node.alternatives):
+                self.frames.append(_Builder(node, container))
+                return
+            for type_node, alternative in node.alternatives:
+                if type_node.matches(container):
+                    node = alternative
+                    break
+            else:
+                self.run.report('one_of', node, _Placeholder(event))
+                self.frames.append(_Skip())
+                return
+
+        if isinstance(node, _AnythingNode):
+            self.frames.append(_Skip())
+        elif isinstance(node, _TypeNode) and node.static:
+            if not node.matches(container):
+                self.run.report('type', node, _Placeholder(event))
+                self.frames.append(_Skip())
+            elif isinstance(node, _DictNode):
+                self.frames.append(_DictFrame(node))
+            elif isinstance(node, _ListNode):
+                if node.item is None:
+                    # raises SpecError
+                    node.check(container, self.run)
+                index = [0]
+                self.obj_pos.append(index)
+                self.frames.append(_ListFrame(node.item, index))
+            else:
+                # e.g. dict or list type
+                self.frames.append(_Skip())
+        else:
+            self.frames.append(_Builder(node, container))
+
+class _Placeholder(object):
+    # data of errors for dicts and lists that were not loaded
+    def __init__(self, event):
+        self.event = event
+
+    def __repr__(self):
+        if self.event == 'start_map':
+            return '{...}'
+        return '[...]'
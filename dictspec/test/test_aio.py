@@ -0,0 +1,159 @@
+# -:- encoding: utf8 -:-
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+
+import unittest
+
+from ..validator import Validator, ValidationError
+from ..spec import required, number, recursive, one_of
+
+try:
+    import asyncio
+    from .. import aio
+except (ImportError, SyntaxError):
+    aio = None
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+def collect(agen):
+    results = []
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                results.append(loop.run_until_complete(agen.__anext__()))
+            except StopAsyncIteration:
+                return results
+    finally:
+        loop.close()
+
+class AsyncIter(object):
+    def __init__(self, items):
+        self.items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        future = asyncio.Future()
+        try:
+            future.set_result(next(self.items))
+        except StopIteration:
+            future.set_exception(StopAsyncIteration())
+        return future
+
+def errors(validator, data):
+    try:
+        validator.validate(data)
+    except ValidationError as ex:
+        return ex.errors
+    return []
+
+@unittest.skipIf(aio is None, 'requires Python 3')
+class TestAsync(unittest.TestCase):
+    spec = {'records': [{required('id'): int, 'price': number(), 'tags': [str()]}]}
+    data = {'records': [
+        {'id': i, 'price': 'x' if i % 300 == 0 else i, 'tags': ['a', 1] if i % 700 == 0 else [], 'foo': 1}
+        for i in range(2000)
+    ] + [{}]}
+
+    def test_same_errors(self):
+        expected = errors(Validator(self.spec), self.data)
+        try:
+            run(aio.validate(self.spec, self.data, steps=10))
+        except ValidationError as ex:
+            assert ex.errors == expected
+        else:
+            assert False
+
+    def test_yields_to_loop(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        ticks = []
+        def tick():
+            ticks.append(1)
+            loop.call_soon(tick)
+        loop.call_soon(tick)
+        loop.run_until_complete(aio.validate({'a': [{'b': int}]}, {'a': [{'b': i} for i in range(10000)]}, steps=100))
+        assert len(ticks) > 50, len(ticks)
+
+    def test_executor(self):
+        validator = Validator({'a': [int]}, fail_fast=True)
+        run(aio.validate(validator, {'a': [1, 2]}, executor_threshold=0))
+        try:
+            run(aio.validate(validator, {'a': [1, 'x']}, executor_threshold=0))
+        except ValidationError as ex:
+            assert ex.errors == ["'x' in a[1] not of type int"]
+        else:
+            assert False
+
+    def test_sample_stats(self):
+        validator = Validator([int], sample=10, sample_seed=1)
+        data = list(range(100))
+        expected = validator.validate(data)
+        for threshold in (None, 0):
+            stats = run(aio.validate(validator, data, executor_threshold=threshold))
+            assert (stats.checked, stats.skipped) == (expected.checked, expected.skipped), threshold
+        assert run(aio.validate([int], data)) is None
+        assert run(aio.validate([int], data, executor_threshold=0)) is None
+        expected = [r.sample_stats for r in validator.validate_many([data, data + ['x']])]
+        results = collect(aio.validate_many(validator, [data, data + ['x']]))
+        for result, stats in zip(results, expected):
+            assert (result.sample_stats.checked, result.sample_stats.skipped) == (
+                stats.checked, stats.skipped)
+
+    def test_max_depth(self):
+        deep = None
+        for _ in range(150):
+            deep = {'a': deep}
+        cases = [
+            ({'a': {'b': int}}, {'a': None}, 1),
+            ({'a': {'b': int}}, {'a': {'b': 1}}, 1),
+            ({'a': {'b': one_of({}, int)}}, {'a': {'b': None}}, 2),
+            ({'a': [{'b': int}]}, {'a': [{'b': 1}, None]}, 2),
+            (recursive({'a': recursive()}), deep, 120),
+            (recursive({'a': recursive()}), deep, 200),
+        ]
+        for spec, data, max_depth in cases:
+            validator = Validator(spec, max_depth=max_depth)
+            expected = errors(validator, data)
+            try:
+                run(aio.validate(validator, data))
+            except ValidationError as ex:
+                assert ex.errors == expected, (spec, max_depth)
+            else:
+                assert expected == [], (spec, max_depth)
+
+    def test_validate_many(self):
+        docs = [{'id': 1}, {}, {'id': 'x', 'foo': 1}]
+        for source in (docs, AsyncIter(docs)):
+            results = collect(aio.validate_many({required('id'): int}, source))
+            assert [r.valid for r in results] == [True, False, False]
+            assert results[2].errors == ["'x' in id not of type int", "unknown 'foo' in ."]
+
+if __name__ == '__main__':
+    unittest.main()
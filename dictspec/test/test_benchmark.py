@@ -0,0 +1,42 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+
+import unittest
+
+from ..benchmark import benchmarks, run, compare
+
+class TestBenchmark(unittest.TestCase):
+    def test_run(self):
+        results = {}
+        for benchmark in benchmarks(scale=0.001):
+            # raises for invalid documents in valid benchmarks
+            results[benchmark.name] = run(benchmark, repeat=1)
+        assert 'records' in results
+        assert results['records']['docs_per_s'] > 0
+
+    def test_compare(self):
+        baseline = {'a': {'mb_per_s': 10.0}, 'b': {'mb_per_s': 10.0}}
+        results = {'a': {'mb_per_s': 9.5}, 'b': {'mb_per_s': 5.0}, 'c': {'mb_per_s': 1.0}}
+        assert compare(results, baseline) == [('a', 0.95, False), ('b', 0.5, True)]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import absolute_import
+
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from ..validator import Validator, ValidationError, compile, _ANYTHING
+from ..spec import required, default, one_of, number, recursive, type_spec, anything
+from ..cache import SpecCache, spec_hash
+
+def make_spec():
+    return {
+        required('id'): int,
+        'value': one_of(number(), str, [int]),
+        'tree': recursive({'children': [recursive()], anything(): anything()}),
+        'items': [type_spec('type', {'a': {'a': int}, 'b': {'b': [str]}})],
+    }
+
+DATA = {
+    'id': 1,
+    'value': [1, 2],
+    'tree': {'children': [{'children': [], 'x': 1}]},
+    'items': [{'type': 'a', 'a': 1}, {'type': 'b', 'b': ['x']}],
+}
+
+class TestPickle(unittest.TestCase):
+    def test_validator(self):
+        validator = Validator(make_spec(), fail_fast=True)
+        validator.validate(DATA)
+        validator = pickle.loads(pickle.dumps(validator, pickle.HIGHEST_PROTOCOL))
+        validator.validate(DATA)
+        assert validator.raise_first_error
+        try:
+            validator.validate({'id': 1, 'value': True})
+        except ValidationError as ex:
+            assert ex.errors == ['True in value not of any type number, str, list']
+        else:
+            assert False
+
+    def test_anything(self):
+        plan = pickle.loads(pickle.dumps(compile({'a': anything()}), 2))
+        assert plan.root.values['a'] is _ANYTHING
+
+class TestSpecHash(unittest.TestCase):
+    def test_equal(self):
+        assert spec_hash(make_spec()) == spec_hash(make_spec())
+        assert spec_hash({'a': int, 'b': str}) == spec_hash({'b': str, 'a': int})
+
+    def test_different(self):
+        hashes = set([
+            spec_hash({'a': int}),
+            spec_hash({required('a'): int}),
+            spec_hash({'a': str}),
+            spec_hash({'a': [int]}),
+            spec_hash({'a': one_of(int)}),
+            spec_hash({'a': recursive({'a': recursive()})}),
+            spec_hash({default('a', 1): int}),
+            spec_hash({default('a', 2): int}),
+        ])
+        assert len(hashes) == 8
+
+    def test_stable_between_processes(self):
+        code = 'from dictspec.test.test_cache import make_spec; from dictspec.cache import spec_hash; print(spec_hash(make_spec()))'
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=root)
+        assert output.decode('ascii').strip() == spec_hash(make_spec())
+
+class TestSpecCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_compile(self):
+        cache = SpecCache(self.tmpdir + '/cache')
+        plan = cache.compile(make_spec())
+        Validator(plan).validate(DATA)
+        cached = SpecCache(self.tmpdir + '/cache').compile(make_spec())
+        assert cached is not plan
+        Validator(cached).validate(DATA)
+
+    def test_get(self):
+        cache = SpecCache(self.tmpdir)
+        built = []
+        def build():
+            built.append(1)
+            return make_spec()
+        cache.get('spec', build)
+        Validator(cache.get('spec', build)).validate(DATA)
+        assert len(built) == 1
+
+    def test_invalid_file(self):
+        cache = SpecCache(self.tmpdir)
+        with open(cache.filename('spec'), 'wb') as f:
+            f.write(b'invalid')
+        Validator(cache.get('spec', make_spec)).validate(DATA)
+        Validator(SpecCache(self.tmpdir).get('spec', None)).validate(DATA)
+
+if __name__ == '__main__':
+    unittest.main()
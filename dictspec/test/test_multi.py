@@ -0,0 +1,98 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+
+import unittest
+
+from ..validator import Validator
+from ..spec import required, one_of, number, recursive, anything
+from ..multi import MultiValidator, validate_specs, _canonical_nodes
+
+V1 = {required('id'): int, 'price': number(), 'tags': [str], 'meta': {'a': int}}
+V2 = {required('id'): int, 'price': float, 'tags': [str], 'meta': {'a': int}, 'new': str}
+
+def errors(results):
+    return [r.errors for r in results]
+
+class TestMultiValidator(unittest.TestCase):
+    def test_valid(self):
+        results = validate_specs([V1, V2], {'id': 1, 'price': 1.5, 'tags': ['a']})
+        assert [r.valid for r in results] == [True, True]
+        assert [r.index for r in results] == [0, 1]
+
+    def test_errors(self):
+        data = {'id': 1, 'price': 1, 'tags': ['a', 2], 'new': 'x', 'meta': {'a': 'x'}}
+        results = validate_specs([V1, V2], data)
+        assert sorted(results[0].errors) == sorted(["unknown 'new' in .",
+            "2 in tags[1] not of type str", "'x' in meta.a not of type int"])
+        assert sorted(results[1].errors) == sorted(["1 in price not of type float",
+            "2 in tags[1] not of type str", "'x' in meta.a not of type int"])
+        assert not results[0].informal_only
+
+    def test_same_as_validator(self):
+        records = [{'id': i, 'price': 1.5, 'tags': ['a'], 'meta': {'a': i}} for i in range(40)]
+        records[5]['price'] = 2
+        records[7]['meta'] = {'a': 'x'}
+        del records[9]['id']
+        data = {'records': records}
+        specs = [{'records': [V1]}, {'records': [V2]}, {'records': [dict(V2, tags=[int])]}]
+        for options in [{}, {'fail_fast': True}, {'max_errors': 2}, {'max_depth': 2}, {'max_depth': 3}]:
+            validators = [Validator(s, **options) for s in specs]
+            expected = []
+            for v in validators:
+                try:
+                    v.validate(data)
+                except Exception as ex:
+                    expected.append(ex.errors)
+                else:
+                    expected.append([])
+            assert errors(MultiValidator(validators).validate(data)) == expected, options
+
+    def test_options(self):
+        results = MultiValidator([V1, Validator(V2, fail_fast=True)]).validate(
+            {'id': 'x', 'price': 'x'})
+        assert len(results[0].errors) == 2
+        assert len(results[1].errors) == 1
+
+    def test_recursive(self):
+        spec = recursive({'a': [recursive()], 'b': one_of(int, str)})
+        results = validate_specs([spec, {'a': [anything()], 'b': int}],
+            {'a': [{'a': [], 'b': 'x'}, {'b': 1.5}], 'b': 1})
+        assert errors(results) == [['1.5 in a[1].b not of any type int, str'], []]
+
+    def test_max_depth_one_of(self):
+        results = validate_specs([{'a': {'b': one_of({}, int)}}, {'a': {'b': {}}}],
+            {'a': {'b': None}}, max_depth=2)
+        assert errors(results) == [[], []]
+
+class TestCanonical(unittest.TestCase):
+    def test_equal_nodes(self):
+        v1, v2 = Validator(V1), Validator(V2)
+        canonical = _canonical_nodes([v1.compiled_spec.root, v2.compiled_spec.root])
+        root1, root2 = v1.compiled_spec.root, v2.compiled_spec.root
+        assert canonical[id(root2)] is root2
+        for k in ['id', 'tags', 'meta']:
+            assert canonical[id(root2.values[k])] is canonical[id(root1.values[k])]
+        assert canonical[id(root2.values['price'])] is root2.values['price']
+        assert canonical[id(root1.values['price'])] is root1.values['price']
+
+if __name__ == '__main__':
+    unittest.main()
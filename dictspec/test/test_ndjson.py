@@ -0,0 +1,77 @@
+# -:- encoding: utf8 -:-
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..spec import required, number
+from ..validator import compile
+from ..ndjson import validate_lines
+
+class TestValidateLines(unittest.TestCase):
+    spec = {required('id'): int, 'price': number()}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'data.ndjson')
+        with open(self.filename, 'w') as f:
+            for i in range(1000):
+                if i % 100 == 7:
+                    f.write(json.dumps({'id': i, 'price': 'free'}) + '\n')
+                else:
+                    f.write(json.dumps({'id': i, 'price': i * 1.5}) + '\n')
+            f.write('\n')
+            f.write('{"id": 1,\n')
+            f.write('{"price": 1}')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check(self, results):
+        assert [r.index for r in results] == [8, 108, 208, 308, 408, 508, 608, 708, 808, 908, 1002, 1003], \
+            [r.index for r in results]
+        assert len(results[0].errors) == 1
+        assert "'free' in price not of type number" in results[0].errors[0], results[0].errors
+        assert results[-2].errors[0].startswith('invalid JSON')
+        assert results[-1].errors == ["missing 'id', not in ."]
+
+    def test_single_process(self):
+        self.check(list(validate_lines(self.spec, self.filename, processes=1, chunk_size=1000)))
+
+    def test_processes(self):
+        self.check(list(validate_lines(compile(self.spec), self.filename, processes=3, chunk_size=1000)))
+
+    def test_all_lines(self):
+        results = list(validate_lines(self.spec, self.filename, processes=2, chunk_size=100, all_lines=True))
+        assert [r.index for r in results] == list(range(1, 1004))
+        assert sum(r.valid for r in results) == 991
+
+    def test_empty_file(self):
+        open(self.filename, 'w').close()
+        assert list(validate_lines(self.spec, self.filename, processes=2)) == []
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+
+import unittest
+
+from ..validator import Validator
+from ..spec import required, one_of, number, recursive, type_spec, anything
+from ..optimize import optimize, analyze
+
+class TestOptimize(unittest.TestCase):
+    def test_one_of(self):
+        spec = optimize(one_of(number(), int, one_of(str, float), str, anything(), dict))
+        assert spec.specs == (spec.specs[0], int, str, spec.specs[3])
+        assert isinstance(spec.specs[0], number)
+        assert isinstance(spec.specs[3], anything)
+        assert Validator(spec).is_valid(True)
+
+    def test_single_alternative(self):
+        assert optimize({'a': one_of(int, int)}) == {'a': int}
+        assert optimize([one_of(one_of(str), str)]) == [str]
+        assert isinstance(optimize(one_of(anything(), int)), anything)
+
+    def test_any_key(self):
+        key = anything()
+        spec = optimize({key: int, 'a': str, required('b'): str})
+        assert spec[key] is int
+        assert 'a' not in spec
+        assert isinstance(spec['b'], anything)
+
+    def test_type_spec(self):
+        spec = optimize([type_spec('type', {'a': {'v': one_of(int, int)}})])
+        assert spec[0].specs['a'] == {'v': int, 'type': str()}
+
+    def test_recursive(self):
+        spec = optimize(recursive({'a': one_of([recursive()], list)}))
+        assert type(spec.spec['a']) is list
+        assert Validator(spec).is_valid({'a': [{'a': []}]})
+        assert not Validator(spec).is_valid({'a': [{'a': 1}]})
+
+    def test_unchanged(self):
+        spec = {'a': one_of(int, int)}
+        optimize(spec)
+        assert len(spec['a'].specs) == 2
+
+class TestAnalyze(unittest.TestCase):
+    def test_problems(self):
+        spec = {
+            'a': [int, str],
+            'b': recursive(),
+            'c': recursive({'d': [recursive()]}),
+            'e': one_of(number(), float),
+            'f': {anything(): int, 'g': str},
+            'h': one_of(str, one_of(int, float)),
+        }
+        assert sorted(analyze(spec)) == [
+            "'g' checked with the value of anything() in f",
+            'list spec with 2 types in a',
+            'nested one_of never selected in h<one_of>',
+            'recursive() outside recursive spec in b',
+            'unreachable alternative, number matches first in e<float>',
+        ]
+
+    def test_no_problems(self):
+        assert analyze({required('a'): [one_of(int, str)], 'b': recursive({'c': recursive()})}) == []
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+
+import unittest
+
+from .. import validator
+from ..validator import Validator, ValidationError
+from ..spec import required, number, one_of, anything
+
+SPEC = {
+    'records': [{required('id'): int, 'price': number(), 'tags': [str], 'meta': {'a': int}}],
+    'index': {anything(): int},
+    'other': one_of(int, [int]),
+}
+
+def make_data():
+    records = [{'id': i, 'price': 1.5, 'tags': ['a'], 'meta': {'a': i}} for i in range(100)]
+    records[5]['price'] = 'x'
+    records[17]['tags'] = ['a', 1]
+    records[20]['foo'] = 1
+    del records[60]['id']
+    records[99] = None
+    index = dict(('k%d' % i, i) for i in range(50))
+    index['k7'] = 'x'
+    return {'records': records, 'index': index, 'other': [1, 2, 'x']}
+
+def errors(v, data):
+    try:
+        v.validate(data)
+    except ValidationError as ex:
+        return ex.errors, ex.informal_only
+    return None
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        if validator.ThreadPoolExecutor is None:
+            raise unittest.SkipTest('requires concurrent.futures')
+        self.free_threading = validator._free_threading
+        # test the parallel validation with the GIL
+        validator._free_threading = lambda: True
+
+    def tearDown(self):
+        validator._free_threading = self.free_threading
+
+    def test_same_errors(self):
+        data = make_data()
+        for options in [{}, {'fail_fast': True}, {'max_errors': 3}, {'aggregate': True},
+            {'max_depth': 2}, {'max_depth': 3}]:
+            expected = errors(Validator(SPEC, **options), data)
+            for size in [1, 10, 20]:
+                v = Validator(SPEC, threads=3, parallel_size=size, **options)
+                assert errors(v, data) == expected, (options, size)
+
+    def test_valid(self):
+        data = make_data()
+        data['records'] = [{'id': i, 'price': i, 'tags': ['a']} for i in range(100)]
+        data['index'] = {'a': 1}
+        data['other'] = 1
+        Validator(SPEC, threads=3, parallel_size=10).validate(data)
+
+    def test_not_used(self):
+        calls = []
+        check_chunks = validator._Parallel.check_chunks
+        def counted(self, node, data):
+            calls.append(len(data))
+            return check_chunks(self, node, data)
+        validator._Parallel.check_chunks = counted
+        try:
+            data = make_data()
+            errors(Validator(SPEC, threads=3, parallel_size=1000), data)
+            errors(Validator(SPEC, threads=3, parallel_size=10, sample=10), data)
+            assert calls == []
+            errors(Validator(SPEC, threads=3, parallel_size=50), data)
+            assert calls == [100, 50]
+        finally:
+            validator._Parallel.check_chunks = check_chunks
+
+class TestGIL(unittest.TestCase):
+    def test_fallback(self):
+        if validator._free_threading():
+            raise unittest.SkipTest('requires GIL')
+        data = make_data()
+        assert errors(Validator(SPEC, threads=3, parallel_size=1), data) == errors(
+            Validator(SPEC), data)
+
+if __name__ == '__main__':
+    unittest.main()
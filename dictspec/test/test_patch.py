@@ -0,0 +1,137 @@
+# -:- encoding: utf8 -:-
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+
+import unittest
+
+from ..validator import Validator, ValidationError
+from ..spec import required, number, type_spec, recursive
+from ..patch import validate_changes, parse_pointer
+
+class counted(object):
+    """
+    Accepts anything and counts the checked values.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def compare_type(self, data):
+        self.calls += 1
+        return True
+
+def errors(*args, **kw):
+    try:
+        validate_changes(*args, **kw)
+    except ValidationError as ex:
+        return ex.errors
+    return []
+
+class TestValidateChanges(unittest.TestCase):
+    def setUp(self):
+        self.counter = counted()
+        self.spec = {
+            required('tenants'): [{required('name'): str(), 'limits': [{required('key'): str(), 'value': number()}]}],
+            'shapes': [type_spec('type', {'circle': {'radius': number()}, 'rect': {'width': number()}})],
+            'tree': recursive({'children': [recursive()], 'value': int}),
+            'other': [self.counter],
+        }
+        self.doc = {
+            'tenants': [{'name': 'a', 'limits': [{'key': 'x', 'value': 1}]}],
+            'shapes': [{'type': 'circle', 'radius': 1}],
+            'tree': {'children': [{'children': [{'value': 1}]}]},
+            'other': list(range(1000)),
+        }
+        self.validator = Validator(self.spec)
+        self.validator.validate(self.doc)
+        self.counter.calls = 0
+
+    def test_add(self):
+        self.doc['tenants'][0]['limits'].append({'key': 'y', 'value': 'many'})
+        result = errors(self.validator, self.doc, [{'op': 'add', 'path': '/tenants/0/limits/-', 'value': {}}])
+        assert result == ["'many' in tenants[0].limits[1].value not of type number"], result
+        assert self.counter.calls == 0
+
+    def test_paths(self):
+        self.doc['tenants'][0]['limits'][0]['value'] = None
+        self.doc['tree']['children'][0]['children'][0]['value'] = 'x'
+        result = errors(self.spec, self.doc, [['tenants', 0, 'limits', 0, 'value'], '/tree/children/0/children/0'])
+        assert result == [
+            '{} in tenants[0].limits[0].value not of type number',
+            "'x' in tree.children[0].children[0].value not of type int",
+        ], result
+
+    def test_remove_required(self):
+        del self.doc['tenants'][0]['name']
+        result = errors(self.validator, self.doc, [{'op': 'remove', 'path': '/tenants/0/name'}])
+        assert result == ["missing 'name', not in tenants[0]"], result
+        del self.doc['tenants'][0]
+        assert errors(self.validator, self.doc, [{'op': 'remove', 'path': '/tenants/0'}]) == []
+
+    def test_move(self):
+        self.doc['tenants'][0]['title'] = self.doc['tenants'][0].pop('name')
+        result = errors(self.validator, self.doc, [{'op': 'move', 'from': '/tenants/0/name', 'path': '/tenants/0/title'}])
+        assert result == ["missing 'name', not in tenants[0]", "unknown 'title' in tenants[0]"], result
+
+    def test_type_key(self):
+        self.doc['shapes'][0]['type'] = 'rect'
+        result = errors(self.validator, self.doc, [{'op': 'replace', 'path': '/shapes/0/type', 'value': 'rect'}])
+        assert result == ["unknown 'radius' in shapes[0]"], result
+
+    def test_replace_parent(self):
+        self.doc['tenants'] = {'name': 'a'}
+        result = errors(self.validator, self.doc, [{'op': 'replace', 'path': '/tenants', 'value': {}}])
+        assert len(result) == 1 and 'not of type list' in result[0], result
+
+    def test_root(self):
+        self.doc['other'].append(1)
+        assert errors(self.validator, self.doc, [{'op': 'test', 'path': '/other', 'value': 1}, '']) == []
+        assert self.counter.calls == 1001
+
+    def test_moved_items(self):
+        changes = [{'op': 'replace', 'path': '/l/0', 'value': 'x'}, {'op': 'add', 'path': '/l/0', 'value': 1}]
+        assert errors({'l': [int]}, {'l': [1, 'x']}, changes) == ["'x' in l[1] not of type int"]
+        changes = [{'op': 'add', 'path': '/l/-', 'value': 'x'}, {'op': 'add', 'path': '/l/-', 'value': 1}]
+        assert errors({'l': [int]}, {'l': [1, 'x', 1]}, changes) == ["'x' in l[1] not of type int"]
+        changes = [{'op': 'move', 'from': '/l/1/v', 'path': '/l/1'}]
+        result = errors({'l': [{required('v'): int}]}, {'l': [{'v': 1}, 1, {}]}, changes)
+        assert result == ['1 in l[1] not of type dict', "missing 'v', not in l[2]"], result
+
+    def test_removed_parent(self):
+        changes = [{'op': 'remove', 'path': '/a/b/c'}, {'op': 'remove', 'path': '/a/b'}]
+        assert errors({'a': {'b': {'c': int}}}, {'a': {}}, changes) == []
+        self.doc['tenants'][0]['limits'][0]['value'] = 'x'
+        del self.doc['tenants'][0]['limits']
+        changes = [
+            {'op': 'replace', 'path': '/tenants/0/limits/0/value', 'value': 'x'},
+            {'op': 'remove', 'path': '/tenants/0/limits'},
+            {'op': 'replace', 'path': '/tenants/0/name', 'value': 'b'},
+        ]
+        assert errors(self.validator, self.doc, changes) == []
+        assert self.counter.calls == 0
+
+    def test_parse_pointer(self):
+        assert parse_pointer('') == []
+        assert parse_pointer('/') == ['']
+        assert parse_pointer('/a~1b/~0c/0') == ['a/b', '~c', '0']
+
+if __name__ == '__main__':
+    unittest.main()
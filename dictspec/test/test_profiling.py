@@ -0,0 +1,76 @@
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import absolute_import
+
+import unittest
+
+from ..validator import Validator, ValidationError, compile
+from ..spec import one_of, recursive
+from ..profiling import Profiler
+
+class TestProfiler(unittest.TestCase):
+    def test_stats(self):
+        profiler = Profiler()
+        validator = Validator([{'a': int, 'b': one_of(int, str)}], profiler=profiler)
+        validator.validate([{'a': 1, 'b': 'x'}, {'a': 2, 'b': 3}])
+        try:
+            validator.validate([{'a': 'x'}])
+        except ValidationError:
+            pass
+        stats = dict((s.path, s) for s in profiler.stats())
+        assert sorted(stats) == ['.', '[*]', '[*].a', '[*].b', '[*].b<int>', '[*].b<str>']
+        assert stats['[*].a'].calls == 3
+        assert stats['[*].a'].errors == 1
+        assert stats['[*]'].errors == 0
+        assert stats['.'].kind == 'list'
+        assert stats['[*].b'].kind == 'one_of'
+        assert stats['[*].b<str>'].calls == 1
+        assert stats['.'].time >= stats['[*]'].time >= stats['[*]'].own_time
+
+        profiler.reset()
+        assert stats['.'].calls == 0
+
+    def test_recursive(self):
+        profiler = Profiler()
+        spec = recursive({'name': str, 'children': [recursive()]})
+        validator = Validator(spec, profiler=profiler)
+        validator.validate({'name': 'a', 'children': [{'name': 'b', 'children': [{}]}]})
+        stats = dict((s.path, s) for s in profiler.stats())
+        assert stats['.'].calls == 3
+        assert stats['children[*]'].kind == 'recursive'
+
+    def test_callback(self):
+        calls = []
+        profiler = Profiler(callback=lambda stats, seconds, errors: calls.append((stats.path, errors)))
+        try:
+            Validator({'a': int}, profiler=profiler).validate({'a': 'x'})
+        except ValidationError:
+            pass
+        assert calls == [('a', 1), ('.', 0)]
+
+    def test_compiled_spec_unchanged(self):
+        plan = compile({'a': int})
+        Validator(plan, profiler=Profiler())
+        assert 'check' not in plan.root.__dict__
+
+if __name__ == '__main__':
+    unittest.main()
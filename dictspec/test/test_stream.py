@@ -0,0 +1,118 @@
+# -:- encoding: utf8 -:-
+# Copyright (c) 2011, Oliver Tonnhofer <olt@omniscale.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from __future__ import absolute_import
+
+import unittest
+
+from ..validator import validate, ValidationError, SpecError
+from ..spec import required, one_of, number, recursive, type_spec, anything
+from ..stream import validate_events
+
+def events(data):
+    """
+    Basic parser events for `data`, like ijson.basic_parse.
+    """
+    if isinstance(data, dict):
+        yield 'start_map', None
+        for k, v in data.items():
+            yield 'map_key', k
+            for e in events(v):
+                yield e
+        yield 'end_map', None
+    elif isinstance(data, list):
+        yield 'start_array', None
+        for v in data:
+            for e in events(v):
+                yield e
+        yield 'end_array', None
+    elif data is None:
+        yield 'null', None
+    elif isinstance(data, bool):
+        yield 'boolean', data
+    elif isinstance(data, (int, float)):
+        yield 'number', data
+    else:
+        yield 'string', data
+
+def errors(f, *args, **kw):
+    try:
+        f(*args, **kw)
+    except ValidationError as ex:
+        return sorted(ex.errors)
+    return []
+
+class TestStream(unittest.TestCase):
+    def check_same(self, spec, data):
+        expected = errors(validate, spec, data)
+        result = errors(validate_events, spec, events(data))
+        assert result == expected, (result, expected)
+
+    def test_valid(self):
+        spec = {required('foo'): [number()], 'bar': {anything(): str()}}
+        validate_events(spec, events({'foo': [1, 2.5], 'bar': {'a': 'b'}}))
+
+    def test_same_errors_as_validate(self):
+        spec = {
+            required('id'): int,
+            'tags': [str()],
+            'items': [{required('name'): str(), 'value': one_of(number(), [number()], {'x': 1})}],
+            'any': anything(),
+            'tree': recursive({'name': str(), 'children': [recursive()]}),
+            'typed': [type_spec('type', {'a': {'a': 1}, 'b': {'b': str()}})],
+        }
+        self.check_same(spec, {'id': 1})
+        self.check_same(spec, {'tags': ['a', 1, None]})
+        self.check_same(spec, {'id': 'x', 'unknown': {'a': [1, 2]}, 'any': [{}]})
+        self.check_same(spec, {'items': [{'name': 'a', 'value': [1, 'b']}, {'value': {'x': 'y'}}, {'name': 1}]})
+        self.check_same(spec, {'tree': {'name': 'a', 'children': [{'name': 1, 'children': [{'foo': 1}]}]}})
+        self.check_same(spec, {'typed': [{'type': 'a', 'a': 'x'}, {'type': 'b', 'b': 'y'}, {'type': 'c'}, {}]})
+
+    def test_container_type_errors(self):
+        spec = {'foo': str(), 'bar': [int], 'baz': one_of(str(), number())}
+        result = errors(validate_events, spec, events({'foo': {'a': 1}, 'bar': {}, 'baz': [1]}))
+        assert result == [
+            '[...] in baz not of any type str, number',
+            '{...} in bar not of type list',
+            '{...} in foo not of type str',
+        ], result
+
+    def test_fail_fast_stops_reading(self):
+        consumed = []
+        def tracked(events):
+            for e in events:
+                consumed.append(e)
+                yield e
+        data = [1, 2, 'x'] + list(range(100))
+        result = errors(validate_events, [int], tracked(events(data)), fail_fast=True)
+        assert result == ["'x' in [2] not of type int"], result
+        assert len(consumed) == 4
+
+    def test_spec_error(self):
+        try:
+            validate_events({'a': [int, str]}, events({'a': [1]}))
+        except SpecError:
+            pass
+        else:
+            assert False
+
+if __name__ == '__main__':
+    unittest.main()
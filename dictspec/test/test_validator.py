@@ -23,8 +23,8 @@ from __future__ import absolute_import
 
 import unittest
 
-from ..validator import validate, ValidationError, SpecError
-from ..spec import required, one_of, number, recursive, type_spec, anything
+from ..validator import validate, validate_many, extract, is_valid, compile, Validator, ValidationError, SpecError
+from ..spec import required, default, one_of, number, recursive, type_spec, anything
 
 
 def raises(exception):
@@ -91,6 +91,63 @@ class TestLists(unittest.TestCase):
         spec = [1]
         validate(spec, [1, 'hello'])
 
+    def test_bulk_errors(self):
+        spec = [number()]
+        validate(spec, [1, 2.0, 3])
+        try:
+            validate(spec, [1, 2.0, True, None, 'x', 3])
+        except ValidationError, ex:
+            assert ex.errors == ['True in [2] not of type number', '{} in [3] not of type number',
+                "'x' in [4] not of type number"], ex.errors
+        else:
+            assert False
+
+    def test_bulk_none(self):
+        validate([dict], [None, {}])
+        validate([anything()], [None, 1, 'x'])
+
+class TestArrays(unittest.TestCase):
+    def test_array(self):
+        from array import array
+        validate({'a': [number()]}, {'a': array('d', [1.0, 2.0])}, accept_arrays=True)
+        validate({'a': [int]}, {'a': array('i', [1, 2])}, accept_arrays=True)
+        validate({'a': [anything()]}, {'a': array('i', [1, 2])}, accept_arrays=True)
+        try:
+            validate({'a': [number()]}, {'a': array('d', [1.0, 2.0])})
+        except ValidationError, ex:
+            assert 'not of type list' in ex.errors[0], ex.errors
+        else:
+            assert False
+
+    def test_array_invalid_items(self):
+        from array import array
+        try:
+            validate([str()], array('i', [1, 2]), accept_arrays=True)
+        except ValidationError, ex:
+            assert ex.errors == ['1 in [0] not of type str', '2 in [1] not of type str'], ex.errors
+        else:
+            assert False
+
+    def test_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            return
+        validate([number()], numpy.arange(10, dtype=float), accept_arrays=True)
+        validate([bool()], numpy.zeros(10, dtype=bool), accept_arrays=True)
+        try:
+            validate([str()], numpy.arange(2), accept_arrays=True)
+        except ValidationError, ex:
+            assert len(ex.errors) == 2, ex.errors
+        else:
+            assert False
+        try:
+            validate([number()], numpy.zeros((2, 2)), accept_arrays=True)
+        except ValidationError, ex:
+            assert 'not of type list' in ex.errors[0], ex.errors
+        else:
+            assert False
+
 class TestNumber(unittest.TestCase):
     def check_valid(self, spec, data):
         validate(spec, data)
@@ -146,6 +203,450 @@ class TestRecursive(unittest.TestCase):
         spec = {'a': recursive()}
         validate(spec, {'a': {'a': {}}})
 
+    def test_nested(self):
+        spec = recursive({'a': recursive({'b': recursive()}), 'c': recursive()})
+        validate(spec, {'a': {'b': {'b': {}}}, 'c': {'a': {}, 'c': {}}})
+
+class TestCompile(unittest.TestCase):
+    def test_reuse(self):
+        spec = compile({required('foo'): [number()], 'bar': one_of(str(), {'baz': 1})})
+        validate(spec, {'foo': [1, 2.3]})
+        validate(spec, {'foo': [], 'bar': {'baz': 2}})
+        try:
+            validate(spec, {'bar': {'baz': 'x'}})
+        except ValidationError, ex:
+            assert ex.errors == ["missing 'foo', not in .", "'x' in bar.baz not of type int"], ex.errors
+        else:
+            assert False
+
+    def test_validator(self):
+        spec = compile({'foo': str()})
+        Validator(spec).validate({'foo': 'bar'})
+        assert Validator(spec).complete_spec == {'foo': str()}
+
+    def test_reuse_validator(self):
+        validator = Validator({'foo': str()})
+        validator.validate({'foo': 'bar'})
+        try:
+            validator.validate({'foo': 1})
+        except ValidationError, ex:
+            assert ex.errors == ['1 in foo not of type str'], ex.errors
+        else:
+            assert False
+        validator.validate({'foo': 'bar'})
+
+    def test_shared_between_threads(self):
+        import threading
+        validator = Validator({'foo': [{'bar': int}]})
+        failures = []
+        def worker(n):
+            for _ in range(200):
+                try:
+                    validator.validate({'foo': [{'bar': 1}] * n + [{'bar': 'x'}]})
+                except ValidationError, ex:
+                    if ex.errors != ["'x' in foo[%d].bar not of type int" % n]:
+                        failures.append(ex.errors)
+                else:
+                    failures.append(None)
+        threads = [threading.Thread(target=worker, args=(n, )) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not failures, failures[:3]
+
+    def test_recursive_outside_spec(self):
+        # only raises when the recursive() spec is reached
+        spec = compile({'a': recursive()})
+        validate(spec, {})
+        try:
+            validate(spec, {'a': {}})
+        except SpecError:
+            pass
+        else:
+            assert False
+
+class TestValidateMany(unittest.TestCase):
+    def test(self):
+        spec = {required('id'): int, 'name': str()}
+        docs = [{'id': 1}, {'name': 'foo'}, {'id': 2, 'foo': 1}, {'id': 'x', 'name': 1}]
+        results = list(validate_many(spec, iter(docs)))
+        assert [r.index for r in results] == [0, 1, 2, 3]
+        assert [r.valid for r in results] == [True, False, False, False]
+        assert results[1].errors == ["missing 'id', not in ."]
+        assert results[1].data is docs[1]
+        assert results[2].informal_only
+        assert not results[3].informal_only
+        assert len(results[3].errors) == 2
+
+    def test_fail_fast(self):
+        validator = Validator([int], fail_fast=True)
+        results = list(validator.validate_many([[1, 'a', 'b'], [], [None]]))
+        assert [r.valid for r in results] == [False, True, False]
+        assert results[0].errors == ["'a' in [1] not of type int"]
+
+class TestOneOfDispatch(unittest.TestCase):
+    def test_first_match(self):
+        spec = compile([one_of(number(), bool(), str(), [int], {'a': 1}, anything())])
+        validate(spec, [1, True, 'a', [1], {'a': 1}, None, 2.0])
+        try:
+            validate(spec, [[1, 'x'], {'a': 'x'}])
+        except ValidationError, ex:
+            assert ex.errors == ["'x' in [0][1] not of type int", "'x' in [1].a not of type int"], ex.errors
+        else:
+            assert False
+
+    def test_no_match(self):
+        spec = compile(one_of(number(), str()))
+        for _ in range(2):
+            try:
+                validate(spec, True)
+            except ValidationError, ex:
+                assert ex.errors == ['True in . not of any type number, str'], ex.errors
+            else:
+                assert False
+
+    def test_custom_compare_type(self):
+        class positive(object):
+            def compare_type(self, data):
+                return isinstance(data, int) and data > 0
+        spec = compile(one_of(positive(), {'a': 1}))
+        validate(spec, 1)
+        try:
+            validate(spec, -1)
+        except ValidationError:
+            pass
+        else:
+            assert False
+
+class TestCache(unittest.TestCase):
+    def test_shared_valid(self):
+        calls = []
+        class counted(object):
+            def compare_type(self, data):
+                calls.append(data)
+                return True
+        shared = {'a': [1, 2, 3]}
+        spec = {'x': [{'a': [counted()]}], 'y': {anything(): {'a': [counted()]}}}
+        data = {'x': [shared] * 100, 'y': {'foo': shared}}
+        validate(spec, data, cache_size=10)
+        assert len(calls) == 6, len(calls)
+        del calls[:]
+        validate(spec, data)
+        assert len(calls) == 303, len(calls)
+
+    def test_shared_invalid(self):
+        shared = {'a': 'x'}
+        try:
+            validate({anything(): {'a': int}}, {'x': shared, 'y': shared}, cache_size=10)
+        except ValidationError, ex:
+            assert sorted(ex.errors) == ["'x' in x.a not of type int", "'x' in y.a not of type int"], ex.errors
+        else:
+            assert False
+
+    def test_max_depth(self):
+        leaf = [[]]
+        for cache_size in [0, 10]:
+            try:
+                validate(recursive([recursive()]), [leaf, [leaf]], max_depth=3, cache_size=cache_size)
+            except ValidationError, ex:
+                assert ex.errors == ['[] in [1][0][0] nested deeper than 3'], ex.errors
+            else:
+                assert False
+
+    def test_eviction(self):
+        objs = [{'a': i} for i in range(10)]
+        validate([{'a': int}], objs * 3, cache_size=2)
+
+class TestAggregate(unittest.TestCase):
+    def test_groups(self):
+        data = [{'price': 'x', 'q': 1} for _ in range(100)] + [{'price': 1.5}, {}]
+        try:
+            validate([{'price': float, required('id'): int}], data, aggregate=True)
+        except ValidationError, ex:
+            groups = dict((g.pattern, g) for g in ex.details)
+            assert sorted((g.kind, p, g.count) for p, g in groups.items()) == [
+                ('missing', '[*].id', 102),
+                ('type', '[*].price', 100),
+                ('unknown', '[*].q', 100),
+            ]
+            assert ex.summary.count == 302
+            assert len(groups['[*].price'].samples) == 3
+            assert groups['[*].price'].samples[2].path == '[2].price'
+            assert str(groups['[*].price']) == "100 x type in [*].price, e.g. 'x' in [0].price not of type float"
+        else:
+            assert False
+
+    def test_samples(self):
+        try:
+            validate({'a': [[int]]}, {'a': [['x', 'y'], ['z']]}, aggregate=True, aggregate_samples=1)
+        except ValidationError, ex:
+            assert len(ex.details) == 1
+            assert ex.details[0].pattern == 'a[*][*]'
+            assert ex.details[0].count == 3
+            assert len(ex.details[0].samples) == 1
+        else:
+            assert False
+
+    def test_with_cache(self):
+        item = {'price': 'x'}
+        try:
+            validate([{'price': float}], [item, item], aggregate=True, cache_size=10)
+        except ValidationError, ex:
+            assert ex.details[0].count == 2
+        else:
+            assert False
+
+class TestDepth(unittest.TestCase):
+    def deep(self, depth):
+        data = {'name': 'leaf', 'children': []}
+        for _ in range(depth):
+            data = {'name': 'node', 'children': [data]}
+        return data
+
+    def test_deep(self):
+        spec = recursive({'name': str, 'children': [recursive()]})
+        data = self.deep(10000)
+        validate(spec, data)
+        leaf = data
+        for _ in range(5000):
+            leaf = leaf['children'][0]
+        leaf['name'] = 1
+        try:
+            validate(spec, data)
+        except ValidationError, ex:
+            assert ex.details[0].path == 'children[0].' * 5000 + 'name'
+        else:
+            assert False
+
+    def test_deep_lists(self):
+        data = []
+        for _ in range(10000):
+            data = [data]
+        validate(recursive([recursive()]), data)
+
+    def test_max_depth(self):
+        spec = recursive({'name': str, 'children': [recursive()]})
+        validate(spec, self.deep(2), max_depth=6)
+        try:
+            validate(spec, self.deep(3), max_depth=6)
+        except ValidationError, ex:
+            assert len(ex.errors) == 1
+            assert ex.details[0].kind == 'depth'
+            assert ex.errors[0].endswith('in children[0].children[0].children[0] nested deeper than 6')
+        else:
+            assert False
+
+    def test_max_depth_scalar_list(self):
+        try:
+            validate({'a': [int]}, {'a': [1, 2]}, max_depth=1)
+        except ValidationError, ex:
+            assert ex.errors == ['[1, 2] in a nested deeper than 1']
+        else:
+            assert False
+
+    def test_max_depth_none(self):
+        validate({'a': {'b': int}}, {'a': None}, max_depth=1)
+        data = None
+        for _ in range(150):
+            data = {'a': data}
+        validate(recursive({'a': recursive()}), data, max_depth=150)
+
+    def test_max_depth_one_of(self):
+        spec = {'a': {'b': one_of({}, int)}}
+        validate(spec, {'a': {'b': None}}, max_depth=2)
+        try:
+            validate(spec, {'a': {'b': {'c': 1}}}, max_depth=2)
+        except ValidationError, ex:
+            assert ex.errors == ["{'c': 1} in a.b nested deeper than 2"], ex.errors
+        else:
+            assert False
+
+    def test_max_depth_columns(self):
+        validate([{'a': int}], [{'a': 1}] * 20, max_depth=2)
+        try:
+            validate([{'a': int}], [{'a': 1}] * 20, max_depth=1)
+        except ValidationError, ex:
+            assert len(ex.errors) == 20
+            assert ex.errors[0] == "{'a': 1} in [0] nested deeper than 1"
+        else:
+            assert False
+        try:
+            validate([{'a': {'b': int}}], [{'a': {'b': 1}}] * 20, max_depth=2)
+        except ValidationError, ex:
+            assert len(ex.errors) == 20
+            assert ex.errors[0] == "{'b': 1} in [0].a nested deeper than 2"
+        else:
+            assert False
+
+class TestSample(unittest.TestCase):
+    def test_size(self):
+        data = [{'a': i} for i in range(1000)]
+        stats = Validator([{'a': int}], sample=10).validate(data)
+        assert (stats.checked, stats.skipped) == (10, 990)
+
+    def test_fraction(self):
+        stats = Validator([[int]], sample=0.1).validate([range(100), range(5)])
+        assert (stats.checked, stats.skipped) == (2 + 10 + 2, 90 + 3)
+
+    def test_first_and_last(self):
+        data = [1] * 1000
+        data[0] = data[-1] = 'x'
+        try:
+            Validator([int], sample=5).validate(data)
+        except ValidationError, ex:
+            assert [e.path for e in ex.details] == ['[0]', '[999]']
+            assert ex.sample_stats.checked == 5
+        else:
+            assert False
+
+    def test_seed(self):
+        data = range(1000)
+        data[500] = 'x'
+        def invalid(seed):
+            results = []
+            for _ in range(5):
+                result = list(Validator([int], sample=100, sample_seed=seed).validate_many([data]))[0]
+                results.append(result.valid)
+            return results
+        for seed in range(10):
+            results = invalid(seed)
+            assert len(set(results)) == 1
+
+    def test_invalid_sample(self):
+        self.assertRaises(ValueError, Validator, [int], sample=0)
+        self.assertRaises(ValueError, Validator, [int], sample=1.5)
+
+    def test_without_sample(self):
+        assert Validator([int]).validate([1]) is None
+
+class TestExtract(unittest.TestCase):
+    def test_unknown_keys(self):
+        data = {'a': 1, 'b': [{'c': 'x', 'd': 2}], 'e': 3}
+        result = extract({'a': int, 'b': [{'c': str}]}, data)
+        assert result == {'a': 1, 'b': [{'c': 'x'}]}
+        assert data['b'][0]['d'] == 2
+
+    def test_defaults(self):
+        spec = {default('port', 80): int, default('hosts', []): [str], 'name': str}
+        result = extract(spec, {'hosts': ['a']})
+        assert result == {'port': 80, 'hosts': ['a']}
+        first = extract(spec, {})
+        first['hosts'].append('a')
+        assert extract(spec, {}) == {'port': 80, 'hosts': []}
+        validate(spec, {'name': 'a'})
+
+    def test_none(self):
+        spec = {'a': {default('b', 1): int}, 'c': anything()}
+        assert extract(spec, {'a': None, 'c': None}) == {'a': {'b': 1}, 'c': None}
+        assert extract([dict], [None, {}]) == [{}, {}]
+        assert extract({'a': [anything()]}, {'a': [None]}) == {'a': [None]}
+
+    def test_one_of_and_type_spec(self):
+        spec = [one_of(int, {'x': int})]
+        assert extract(spec, [1, {'x': 2, 'y': 3}]) == [1, {'x': 2}]
+        spec = [type_spec('type', {'x': {'x': int}})]
+        assert extract(spec, [{'type': 'x', 'x': 2, 'y': 3}]) == [{'type': 'x', 'x': 2}]
+
+    def test_copy(self):
+        data = {'a': [1, 2]}
+        result = extract({'a': [int]}, data)
+        assert result == data
+        assert result['a'] is not data['a']
+
+    def test_deep(self):
+        spec = recursive({'a': recursive(), 'b': [int], default('c', 1): int})
+        data = None
+        for _ in range(150):
+            data = {'a': data, 'b': [1], 'junk': 1}
+        result = extract(spec, data)
+        for _ in range(150):
+            assert sorted(result) == ['a', 'b', 'c']
+            assert result['b'] == [1] and result['b'] is not data['b']
+            result, data = result['a'], data['a']
+        assert result == {'c': 1}
+
+    def test_invalid(self):
+        try:
+            extract({required('a'): int, 'b': [int]}, {'b': [1, 'x'], 'c': 1})
+        except ValidationError, ex:
+            assert ex.errors == ["missing 'a', not in .", "'x' in b[1] not of type int"]
+        else:
+            assert False
+
+class TestColumns(unittest.TestCase):
+    spec = [{required('id'): int, 'price': number(), 'tags': [str], 'meta': {'a': int}}]
+
+    def records(self):
+        return [{'id': i, 'price': 1.5, 'tags': ['a'], 'meta': {'a': 1}} for i in range(50)]
+
+    def errors(self, data, **options):
+        try:
+            validate(self.spec, data, **options)
+        except ValidationError, ex:
+            return ex.errors
+        return []
+
+    def test_valid(self):
+        data = self.records()
+        del data[3]['price']
+        data[4]['meta'] = None
+        assert self.errors(data) == []
+
+    def test_missing(self):
+        data = self.records()
+        del data[10]['id']
+        del data[20]['id']
+        assert self.errors(data) == ["missing 'id', not in [10]", "missing 'id', not in [20]"]
+
+    def test_invalid_column(self):
+        data = self.records()
+        data[7]['price'] = True
+        data[8]['id'] = 'x'
+        assert sorted(self.errors(data)) == ["'x' in [8].id not of type int",
+            'True in [7].price not of type number']
+
+    def test_invalid_row_value(self):
+        data = self.records()
+        data[5]['tags'] = ['a', 1]
+        data[6]['meta'] = {'a': 'x'}
+        assert self.errors(data, fail_fast=True) == ['1 in [5].tags[1] not of type str']
+        assert self.errors(data) == ['1 in [5].tags[1] not of type str',
+            "'x' in [6].meta.a not of type int"]
+
+    def test_unknown_key(self):
+        data = self.records()
+        data[9]['foo'] = 1
+        assert self.errors(data) == ["unknown 'foo' in [9]"]
+
+    def test_not_a_dict(self):
+        data = self.records()
+        data[11] = [1]
+        assert self.errors(data) == ['[1] in [11] not of type dict']
+
+class TestIsValid(unittest.TestCase):
+    spec = {required('id'): int, 'tags': [str], 'meta': {'a': int}}
+
+    def test_valid(self):
+        assert is_valid(self.spec, {'id': 1, 'tags': ['a'], 'meta': {'a': 1}})
+        assert is_valid(self.spec, {'id': 1, 'meta': None})
+
+    def test_invalid(self):
+        assert not is_valid(self.spec, {'tags': ['a']})
+        assert not is_valid(self.spec, {'id': 1, 'tags': ['a', 1]})
+        assert not is_valid(self.spec, {'id': 1, 'meta': {'a': 'x'}})
+        assert not is_valid(self.spec, [])
+
+    def test_unknown(self):
+        data = {'id': 1, 'meta': {'a': 1, 'b': 2}}
+        assert is_valid(self.spec, data)
+        assert not is_valid(self.spec, data, allow_unknown=False)
+
+    def test_options(self):
+        v = Validator({'a': {'b': {}}}, max_depth=2)
+        assert v.is_valid({'a': {}})
+        assert not v.is_valid({'a': {'b': {}}})
+
 class TestTypeSpec(unittest.TestCase):
     def test(self):
         spec = type_spec('type', {'foo': {'alpha': str()}, 'bar': {'one': 1, 'two': str()}})
@@ -196,6 +697,15 @@ class TestErrors(unittest.TestCase):
         else:
             assert False
 
+    def test_nested_list_path(self):
+        spec = {'a': [{'b': [[int]]}]}
+        try:
+            validate(spec, {'a': [{'b': [[1]]}, {'b': [[], [2, 'x']]}]})
+        except ValidationError, ex:
+            assert ex.errors == ["'x' in a[1].b[1][1] not of type int"], ex.errors
+        else:
+            assert False
+
     def test_error_in_non_string_key(self):
         spec = {1: bool()}
         try:
@@ -214,6 +724,81 @@ class TestErrors(unittest.TestCase):
         else:
             assert False
 
+    def test_details(self):
+        data = {'a': [1, 'x']}
+        try:
+            validate({'a': [int]}, data)
+        except ValidationError, ex:
+            msg = ex.details[0]
+            assert msg.kind == 'type'
+            assert msg.path == "a[1]"
+            assert msg.data is data['a'][1]
+            assert str(msg) == ex.errors[0] == "'x' in a[1] not of type int"
+        else:
+            assert False
+
+    def test_long_data_shortened(self):
+        try:
+            validate({'a': int}, {'a': range(10000)})
+        except ValidationError, ex:
+            assert len(ex.errors[0]) < 300
+            assert ex.errors[0].startswith('[0, 1, 2, ')
+            assert '...' in ex.errors[0]
+        else:
+            assert False
+
+    def test_long_containers_shortened(self):
+        class subdict(dict):
+            pass
+        for data in [subdict((i, i) for i in range(10000)), tuple(range(10000))]:
+            try:
+                validate({'a': int}, {'a': data})
+            except ValidationError, ex:
+                assert len(ex.errors[0]) < 300
+                assert '...' in ex.errors[0]
+            else:
+                assert False
+        try:
+            validate({'a': int}, {'a': (1,)})
+        except ValidationError, ex:
+            assert ex.errors == ['(1,) in a not of type int']
+        else:
+            assert False
+
+    def test_message(self):
+        for options in [{}, {'fail_fast': True}]:
+            try:
+                validate({'a': int}, {'a': 'x'}, **options)
+            except ValidationError, ex:
+                assert ex.args[0] == "'x' in a not of type int", ex.args
+                assert str(ex) == "'x' in a not of type int"
+            else:
+                assert False
+
+    def test_max_errors(self):
+        try:
+            validate([int], ['a'] * 10, max_errors=3)
+        except ValidationError, ex:
+            assert len(ex.errors) == 3
+            assert ex.errors[2] == "'a' in [2] not of type int"
+        else:
+            assert False
+
+    def test_max_errors_infos(self):
+        try:
+            validate({'a': int}, {'x': 1, 'y': 2, 'a': 'bad'}, max_errors=2)
+        except ValidationError, ex:
+            assert not ex.informal_only
+            assert sorted(ex.errors) == ["'bad' in a not of type int",
+                "unknown 'x' in .", "unknown 'y' in ."], ex.errors
+        else:
+            assert False
+
+    def test_max_errors_validate_many(self):
+        results = list(validate_many([int], [['a'] * 10, [1]], max_errors=2))
+        assert len(results[0].errors) == 2
+        assert results[1].valid
+
 def test_one_of_with_custom_types():
     # test for fixed validation of one_of specs with values that are
     # not lists or dicts (e.g. recursive)
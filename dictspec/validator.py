@@ -20,150 +20,741 @@
 
 from __future__ import with_statement
 
+import array
+import copy
+import math
+import random
 import re
+import sys
+from collections import deque
+from itertools import chain
+from operator import contains, itemgetter
 from contextlib import contextmanager
 
-from .spec import required, one_of, anything, recursive
-from .compat import iteritems, iterkeys, text_type
+from .spec import required, default, one_of, anything, recursive, type_spec, number
+from .compat import iteritems, text_type, string_type
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
 
 class Context(object):
+    """
+    Position of the validator within the data.
+
+    `obj_pos` is a stack of the raw dict keys and list positions. List
+    positions are one-element lists with the current index (these can't
+    be dict keys), so a list needs only one push for all of its items.
+    The path is only formatted by `current_pos`.
+    """
     def __init__(self):
-        self.recurse_spec = None
         self.obj_pos = []
 
-    def push(self, spec):
-        self.obj_pos.append(spec)
+    def push(self, key):
+        self.obj_pos.append(key)
 
     def pop(self):
         return self.obj_pos.pop()
 
     @contextmanager
-    def pos(self, spec):
-        self.push(spec)
+    def pos(self, key):
+        self.push(key)
         yield
         self.pop()
 
     @property
     def current_pos(self):
-        return ''.join(self.obj_pos).lstrip('.') or '.'
+        return format_pos(self.obj_pos)
+
+    def snapshot(self):
+        """
+        Copy of `obj_pos` as a tuple, with copies of the list positions.
+        """
+        return tuple([p[0]] if isinstance(p, list) else p for p in self.obj_pos)
+
+def format_pos(pos):
+    """
+    Format a position from `Context.obj_pos`.
+
+    >>> format_pos(['foo', [2], 'bar'])
+    'foo[2].bar'
+    """
+    parts = []
+    for p in pos:
+        if isinstance(p, list):
+            parts.append('[%s]' % p[0])
+        else:
+            parts.append('.' + text_type(p))
+    return ''.join(parts).lstrip('.') or '.'
 
-def validate(spec, data):
+def validate(spec, data, **options):
     """
     Validate `data` against `spec`.
+
+    `spec` can also be a `CompiledSpec` as returned by `compile`.
+    The `options` are passed to `Validator`.
+    """
+    return Validator(spec, **options).validate(data)
+
+def extract(spec, data, **options):
+    """
+    Validate `data` against `spec` and return a copy with only the
+    known keys, see `Validator.extract`.
+    """
+    return Validator(spec, **options).extract(data)
+
+def is_valid(spec, data, allow_unknown=True, **options):
+    """
+    True if `data` is valid for `spec`, see `Validator.is_valid`.
+    """
+    return Validator(spec, **options).is_valid(data, allow_unknown=allow_unknown)
+
+def validate_many(spec, docs, **options):
     """
-    return Validator(spec).validate(data)
+    Validate each document of `docs` against `spec`.
+
+    Returns an iterator of `ValidationResult`, see `Validator.validate_many`.
+    """
+    return Validator(spec, **options).validate_many(docs)
+
+class ValidationResult(object):
+    """
+    Result of a single document from `Validator.validate_many`.
+
+    `valid` is True if `validate` would not raise for this document,
+    `errors`, `details`, `informal_only` and `sample_stats` are the same
+    as for the `ValidationError`.
+    """
+    def __init__(self, index, data, errors, informal_only=False, sample_stats=None):
+        self.index = index
+        self.data = data
+        self.details = errors
+        self.informal_only = informal_only
+        self.sample_stats = sample_stats
+        self._errors = None
+
+    @property
+    def errors(self):
+        if self._errors is None:
+            self._errors = [_text(e) for e in self.details]
+        return self._errors
+
+    @property
+    def valid(self):
+        return not self.details
+
+    def __repr__(self):
+        return '<ValidationResult %d valid=%r errors=%d>' % (
+            self.index, self.valid, len(self.details))
 
 class ValidationError(TypeError):
-    def __init__(self, msg, errors=None, informal_only=False):
+    """
+    Invalid data.
+
+    `details` are the `ValidationMessage`s, `errors` are the messages
+    as text. For aggregated validations, `details` are the `ErrorGroup`s
+    of the `ErrorSummary` in `summary`. For sampled validations,
+    `sample_stats` are the `SampleStats`.
+    """
+    sample_stats = None
+
+    def __init__(self, msg, errors=None, informal_only=False, summary=None):
         TypeError.__init__(self, msg)
         self.informal_only = informal_only
-        self.errors = errors or []
+        self.details = errors or []
+        self.summary = summary
+        self._errors = None
+
+    @property
+    def errors(self):
+        if self._errors is None:
+            self._errors = [_text(e) for e in self.details]
+        return self._errors
+
+class ValidationMessage(object):
+    """
+    A validation error, or an info for unknown keys (`info_only`).
+
+    The text is only rendered by `render` (or `str`), with shortened
+    reprs of the data.
+
+    :attr kind: ``'type'``, ``'one_of'``, ``'missing'``, ``'unknown'``,
+        ``'empty'``, ``'type_key'``, ``'type_value'`` or ``'custom'``
+    :attr pos: position in the data, see `Context.snapshot`
+    :attr node: the compiled spec node
+    :attr data: the invalid data
+    :attr key: the missing or unknown key, or the unknown type value
+    """
+    def __init__(self, kind, pos, node=None, data=None, key=None, info_only=False, text=None):
+        self.kind = kind
+        self.pos = pos
+        self.node = node
+        self.data = data
+        self.key = key
+        self.info_only = info_only
+        self.text = text
+
+    @property
+    def path(self):
+        return format_pos(self.pos)
+
+    def render(self):
+        if self.text is None:
+            self.text = _FORMATS[self.kind](self)
+        return self.text
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return '<ValidationMessage %s in %s>' % (self.kind, self.path)
+
+class _Truncated(Exception):
+    pass
+
+def short_repr(data, limit=200):
+    """
+    `repr` of `data`, but shortened to about `limit` characters. Large
+    dicts, lists and tuples are not converted completely.
+
+    >>> short_repr({'a': [1, 2]})
+    "{'a': [1, 2]}"
+    >>> short_repr(list(range(100)), 20)
+    '[0, 1, 2, 3, 4, 5, 6, ...'
+    """
+    parts = []
+    size = [0]
+    def add(text):
+        parts.append(text)
+        size[0] += len(text)
+        if size[0] > limit:
+            raise _Truncated()
+    def add_repr(data):
+        if isinstance(data, dict):
+            add('{')
+            for i, (k, v) in enumerate(iteritems(data)):
+                if i:
+                    add(', ')
+                add_repr(k)
+                add(': ')
+                add_repr(v)
+            add('}')
+        elif isinstance(data, (list, tuple)):
+            add('[' if isinstance(data, list) else '(')
+            for i, v in enumerate(data):
+                if i:
+                    add(', ')
+                add_repr(v)
+            if isinstance(data, list):
+                add(']')
+            else:
+                add(',)' if len(data) == 1 else ')')
+        elif isinstance(data, string_type) and len(data) > limit:
+            add(repr(data[:limit]))
+        else:
+            add(repr(data))
+    try:
+        add_repr(data)
+    except _Truncated:
+        return ''.join(parts)[:limit] + '...'
+    return ''.join(parts)
+
+_FORMATS = {
+    'depth': lambda m: "%s in %s nested deeper than %d" % (short_repr(m.data), m.path, m.key),
+    'type': lambda m: "%s in %s not of type %s" % (short_repr(m.data), m.path, m.node.type_name),
+    'one_of': lambda m: "%s in %s not of any type %s" % (short_repr(m.data), m.path, m.node.type_names),
+    'missing': lambda m: "missing '%s', not in %s" % (m.key, m.path),
+    'unknown': lambda m: "unknown '%s' in %s" % (m.key, m.path),
+    'empty': lambda m: "%s is empty" % (m.path, ),
+    'type_key': lambda m: "'%s' not in %s" % (m.node.type_key, m.path),
+    'type_value': lambda m: "unknown %s value '%s' in %s" % (m.node.type_key, m.key, m.path),
+}
+
+class ErrorSummary(object):
+    """
+    Validation messages grouped by kind and path pattern.
+
+    The pattern is the path of the message with ``*`` for all list
+    indices, e.g. ``[*].price``. For missing and unknown keys, the key
+    is part of the pattern. Only the first `samples` messages of each
+    group are kept, so the memory depends on the number of groups, not
+    on the number of messages.
+    """
+    def __init__(self, samples=3):
+        self.samples = samples
+        self.count = 0
+        self._groups = {}
+        # groups in the order of their first message
+        self._order = []
+
+    def add(self, msg):
+        self.count += 1
+        pos = msg.pos
+        if msg.kind in ('missing', 'unknown'):
+            pos += (msg.key, )
+        key = msg.kind, tuple(_INDEX if isinstance(p, list) else p for p in pos)
+        group = self._groups.get(key)
+        if group is None:
+            pattern = format_pos([['*'] if p is _INDEX else p for p in key[1]])
+            group = self._groups[key] = ErrorGroup(msg.kind, pattern, msg.info_only)
+            self._order.append(group)
+        group.count += 1
+        if len(group.samples) < self.samples:
+            group.samples.append(msg)
+
+    def groups(self):
+        """
+        The `ErrorGroup`s in the order of their first message.
+        """
+        return list(self._order)
+
+    def __iter__(self):
+        return iter(self.groups())
+
+_INDEX = object()
+
+class ErrorGroup(object):
+    """
+    Messages of the same kind and path pattern.
+
+    :attr samples: the first `ValidationMessage`s of this group
+    """
+    def __init__(self, kind, pattern, info_only=False):
+        self.kind = kind
+        self.pattern = pattern
+        self.info_only = info_only
+        self.count = 0
+        self.samples = []
+
+    def render(self):
+        text = '%d x %s in %s' % (self.count, self.kind, self.pattern)
+        if self.samples:
+            text += ', e.g. ' + self.samples[0].render()
+        return text
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return '<ErrorGroup %s in %s: %d>' % (self.kind, self.pattern, self.count)
+
+def _text(msg):
+    if isinstance(msg, string_type):
+        return msg
+    return msg.render()
 
 class SpecError(TypeError):
     pass
 
 class Validator(object):
-    def __init__(self, spec, fail_fast=False):
+    """
+    Validator for a spec.
+
+    A Validator keeps no state between calls to `validate`, so a single
+    instance can be shared between threads.
+
+    The nesting depth of the data is not limited by the recursion limit
+    of Python. Deeply nested values are checked with an explicit stack.
+    """
+    def __init__(self, spec, fail_fast=False, accept_arrays=False, cache_size=0, max_errors=0,
+        aggregate=False, aggregate_samples=3, profiler=None, max_depth=0,
+        sample=None, sample_seed=None, threads=0, parallel_size=10000):
         """
+        :params spec: the spec or a `CompiledSpec`
         :params fail_fast: True if it should raise on the first error
+        :params accept_arrays: True if array.array and one-dimensional
+            NumPy arrays are valid for list specs. Arrays are checked by
+            their typecode or dtype, if possible.
+        :params cache_size: number of valid dicts and lists to remember
+            during each validation. Objects that appear multiple times
+            in the data (e.g. YAML aliases) are only checked once for
+            each spec, as long as they are valid.
+        :params max_errors: stop the validation after this number of
+            errors, infos for unknown keys are not counted
+        :params aggregate: True if messages should be collected in an
+            `ErrorSummary`, grouped by kind and path pattern. The
+            `ValidationError` has one message for each group and the
+            summary as `summary`.
+        :params aggregate_samples: number of example messages for each
+            group of the summary
+        :params profiler: a `dictspec.profiling.Profiler` that records
+            the checks of each spec node
+        :params max_depth: maximum nesting depth of dicts and lists.
+            Deeper values are errors and are not checked.
+        :params sample: only check a sample of the items of large lists,
+            `sample` items of each list (int) or a fraction of the items
+            (float). The sample always includes the first and the last
+            item and one random item of equally sized parts of the list.
+            `validate` returns the `SampleStats`.
+        :params sample_seed: seed for the random sample, the same data is
+            checked with the same sample for the same seed
+        :params threads: number of threads for `validate` on free-threaded
+            Python builds (without GIL). Large dicts and lists are split
+            into parts that are checked in parallel. The messages are
+            the same as without threads. Not used with a GIL, with
+            `sample` or with a `profiler`.
+        :params parallel_size: minimal number of values of a dict or
+            items of a list that are checked in parallel
         """
+        if profiler is not None:
+            spec = profiler.instrument(spec)
+        elif not isinstance(spec, CompiledSpec):
+            spec = compile(spec)
+        self.compiled_spec = spec
+        self.complete_spec = spec.spec
+        self.raise_first_error = fail_fast
+        self.accept_arrays = accept_arrays
+        self.cache_size = cache_size
+        self.max_errors = max_errors
+        self.aggregate_samples = aggregate_samples if aggregate else None
+        self.max_depth = max_depth
+        if sample is not None:
+            # raises for invalid values
+            _Sampler(sample)
+        self.sample = sample
+        self.sample_seed = sample_seed
+        self.threads = threads if sample is None and profiler is None else 0
+        self.parallel_size = parallel_size
+
+    def _new_run(self, run_class=None):
+        run = (run_class or _Run)(self.raise_first_error, accept_arrays=self.accept_arrays,
+            cache_size=self.cache_size, max_errors=self.max_errors,
+            aggregate_samples=self.aggregate_samples, max_depth=self.max_depth)
+        if self.sample is not None:
+            run.sampler = _Sampler(self.sample, self.sample_seed)
+        return run
+
+    def validate(self, data):
+        """
+        Validate `data`. Returns the `SampleStats` for sampled
+        validations, otherwise None.
+        """
+        run = self._new_run()
+        try:
+            if self.threads > 1 and _free_threading():
+                parallel = _Parallel(self, run)
+                try:
+                    parallel.check(self.compiled_spec.root, data, 0)
+                finally:
+                    parallel.close()
+            else:
+                self.compiled_spec.root.check(data, run)
+            run.raise_errors()
+        except ValidationError as ex:
+            ex.sample_stats = run.sample_stats()
+            raise
+        return run.sample_stats()
+
+    def is_valid(self, data, allow_unknown=True):
+        """
+        Check `data` and return True if it is valid, False otherwise.
+
+        Stops at the first error, without any messages or exceptions.
+        Unknown keys are invalid if `allow_unknown` is False.
+        """
+        run = self._new_run(_BoolRun)
+        run.allow_unknown = allow_unknown
+        try:
+            self.compiled_spec.root.check(data, run)
+        except _Invalid:
+            return False
+        return True
+
+    def extract(self, data):
+        """
+        Validate `data` and return a copy of it, in a single pass.
+
+        The copy only contains the keys of the spec: values of unknown
+        keys are dropped (and not reported), missing keys with a
+        `default` are added and None values for dicts are replaced
+        with empty dicts. Lists are copied, other values are not.
+
+        Raises `ValidationError` for invalid data.
+        """
+        run = self._new_run()
+        run.extracting = True
+        result = self.compiled_spec.root.extract(data, run)
+        run.raise_errors()
+        return result
+
+    def validate_many(self, docs):
+        """
+        Validate each document of `docs`, which can be any iterable.
+
+        Returns an iterator with a `ValidationResult` for each document,
+        in the order of `docs`. Invalid documents do not raise.
+        """
+        root = self.compiled_spec.root
+        for i, data in enumerate(docs):
+            run = self._new_run()
+            try:
+                root.check(data, run)
+            except ValidationError as ex:
+                yield ValidationResult(i, data, ex.details, informal_only=ex.informal_only,
+                    sample_stats=run.sample_stats())
+            else:
+                yield ValidationResult(i, data, run.details(), informal_only=not run.errors,
+                    sample_stats=run.sample_stats())
+
+class _Run(object):
+    """
+    State of a single `Validator.validate` call.
+    """
+    def __init__(self, fail_fast, accept_arrays=False, cache_size=0, max_errors=0,
+        aggregate_samples=None, max_depth=0):
         self.context = Context()
-        self.complete_spec = spec
         self.raise_first_error = fail_fast
+        self.accept_arrays = accept_arrays
+        self.memo = _Memo(cache_size) if cache_size else None
+        self.max_errors = max_errors
         self.errors = False
         self.messages = []
+        # number of messages and of errors (without infos)
+        self.count = 0
+        self.error_count = 0
+        # used by dictspec.profiling
+        self.profile_stack = []
+        self.sampler = None
+        # no infos for unknown keys, see Validator.extract
+        self.extracting = False
+        # number of dicts and lists above the current value
+        self.depth = 0
+        self.max_depth = max_depth
+        if max_depth:
+            self.depth_limit = min(max_depth, _RECURSION_DEPTH)
+        else:
+            self.depth_limit = _RECURSION_DEPTH
+        self.summary = None
+        if aggregate_samples is not None:
+            self.summary = ErrorSummary(aggregate_samples)
 
-    def validate(self, data):
-        self._validate_part(self.complete_spec, data)
+    def sample_stats(self):
+        if self.sampler is not None:
+            return self.sampler.stats
+        return None
+
+    def details(self):
+        if self.summary is not None:
+            return self.summary.groups()
+        return self.messages
 
-        if self.messages:
+    def raise_errors(self):
+        if self.summary is not None:
+            if self.summary.count:
+                raise ValidationError('found %d validation errors in %d groups.' % (
+                    self.summary.count, len(self.summary.groups())), self.summary.groups(),
+                    informal_only=not self.errors, summary=self.summary)
+        elif self.messages:
             if len(self.messages) == 1:
-                raise ValidationError(self.messages[0], self.messages, informal_only=not self.errors)
+                raise ValidationError(self.messages[0].render(), self.messages, informal_only=not self.errors)
             else:
                 raise ValidationError('found %d validation errors.' % len(self.messages), self.messages,
                     informal_only=not self.errors)
 
-    def _validate_part(self, spec, data):
-        if hasattr(spec, 'subspec'):
-            try:
-                spec = spec.subspec(data, self.context)
-            except ValueError as ex:
-                return self._handle_error(str(ex))
-
-        if isinstance(spec, recursive):
-            if spec.spec:
-                self.context.recurse_spec = spec.spec
-                self._validate_part(spec.spec, data)
-                self.context.recurse_spec = None
-                return
-            else:
-                spec = self.context.recurse_spec
-                if spec is None:
-                    raise SpecError('found recursive() outside recursive spec')
-
-        if isinstance(spec, anything):
+    def check_deep(self, node, data):
+        """
+        Check the values of a dict or list at `depth_limit` (after
+        `check_head`), with `_walk_items` instead of recursive calls.
+        """
+        if self.max_depth and self.depth >= self.max_depth and isinstance(data, (dict, list)):
+            self.report('depth', node, data, key=self.max_depth)
             return
+        items = _values(node, data, self)
+        if items is not None:
+            for _ in _walk_items(items, self, 0):
+                pass
 
-        if data is None:
-            data = {}
-
-        if isinstance(spec, one_of):
-            # check if at least one spec type matches
-            for subspec in spec.specs:
-                if type_matches(subspec, data):
-                    self._validate_part(subspec, data)
-                    return
+    def extract_deep(self, node, data):
+        """
+        Extract a dict or list at `depth_limit` (after `check_head`),
+        with an explicit stack instead of recursive `extract` calls.
+        """
+        if self.max_depth and self.depth >= self.max_depth and isinstance(data, (dict, list)):
+            self.report('depth', node, data, key=self.max_depth)
+            return data
+        root, items, defaults = _extract_values(node, data, self)
+        if items is None:
+            return root
+        obj_pos = self.context.obj_pos
+        frames = [(root, items, defaults)]
+        # number of frames for max_depth
+        max_depth = self.max_depth - self.depth
+        while frames:
+            result, items, defaults = frames[-1]
+            for key, node, value in items:
+                break
             else:
-                return self._handle_error("%r in %s not of any type %s" %
-                    (data, self.context.current_pos, ', '.join(map(type_str, spec.specs))))
-        elif not type_matches(spec, data):
-            return self._handle_error("%r in %s not of type %s" %
-                (data, self.context.current_pos, type_str(spec)))
-
-        # recurse in dicts and lists
-        if isinstance(spec, dict):
-            self._validate_dict(spec, data)
-        elif isinstance(spec, list):
-            self._validate_list(spec, data)
-
-    def _validate_dict(self, spec, data):
-        accept_any_key = False
-        any_key_spec = None
-        for k in iterkeys(spec):
-            if isinstance(k, required):
-                if k not in data:
-                    self._handle_error("missing '%s', not in %s" %
-                        (k, self.context.current_pos))
-            if isinstance(k, anything):
-                accept_any_key = True
-                any_key_spec = spec[k]
-
-        for k, v in iteritems(data):
-            if accept_any_key:
-                with self.context.pos('.' + text_type(k)):
-                    self._validate_part(any_key_spec, v)
+                frames.pop()
+                _add_defaults(result, defaults)
+                if frames:
+                    obj_pos.pop()
+                continue
 
+            obj_pos.append(key)
+            value, items, defaults = _extract_items(node, value, self,
+                self.max_depth and len(frames) >= max_depth)
+            if isinstance(result, list):
+                result.append(value)
             else:
-                if k not in spec:
-                    self._handle_error("unknown '%s' in %s" %
-                        (k, self.context.current_pos), info_only=True)
-                    continue
-                with self.context.pos('.' + text_type(k)):
-                    self._validate_part(spec[k], v)
+                result[key] = value
+            if items is not None:
+                frames.append((value, items, defaults))
+                continue
+            obj_pos.pop()
+        return root
 
-    def _validate_list(self, spec, data):
-        if not len(spec) == 1:
-            raise SpecError('lists support only one type, got: %s' % spec)
-        for i, v in enumerate(data):
-            with self.context.pos('[%d]' % i):
-                self._validate_part(spec[0], v)
+    def report(self, kind, node, data=None, key=None, info_only=False, text=None):
+        self.handle_error(ValidationMessage(kind, self.context.snapshot(), node, data,
+            key=key, info_only=info_only, text=text), info_only=info_only)
 
-    def _handle_error(self, msg, info_only=False):
+    def handle_error(self, msg, info_only=False):
         if not info_only:
             self.errors = True
         if self.raise_first_error and not info_only:
-            raise ValidationError(msg)
+            raise ValidationError(msg.render(), [msg])
+        if self.summary is not None:
+            self.summary.add(msg)
+        else:
+            self.messages.append(msg)
+        self.count += 1
+        if not info_only:
+            self.error_count += 1
+            if self.error_count == self.max_errors:
+                self.raise_errors()
+
+class _Invalid(Exception):
+    # stops the run of Validator.is_valid or of a _ChunkRun
+    pass
+
+class _BoolRun(_Run):
+    """
+    Run of `Validator.is_valid`, without messages and paths.
+    """
+    allow_unknown = True
+
+    def report(self, kind, node, data=None, key=None, info_only=False, text=None):
+        # infos are only reported for unknown keys
+        if info_only and self.allow_unknown:
+            return
+        raise _Invalid()
+
+class _ChunkRun(_Run):
+    """
+    Run for a part of a dict or list, see `_Parallel`. Collects all
+    messages and stops after the first error (`fail_fast`) or after
+    `max_errors` errors.
+    """
+    def handle_error(self, msg, info_only=False):
         self.messages.append(msg)
+        self.count += 1
+        if not info_only:
+            self.errors = True
+            self.error_count += 1
+            if self.raise_first_error or self.error_count == self.max_errors:
+                raise _Invalid()
+
+class SampleStats(object):
+    """
+    Number of checked and skipped list items of a sampled validation.
+    """
+    def __init__(self):
+        self.checked = 0
+        self.skipped = 0
+
+    def __repr__(self):
+        return '<SampleStats checked=%d skipped=%d>' % (self.checked, self.skipped)
+
+class _Sampler(object):
+    """
+    Selects the items of lists to check, for the `sample` option.
+    """
+    def __init__(self, sample, seed=None):
+        if isinstance(sample, float):
+            if not 0 < sample <= 1:
+                raise ValueError('sample fraction needs to be > 0 and <= 1, got %r' % sample)
+        elif sample < 1:
+            raise ValueError('sample size needs to be >= 1, got %r' % sample)
+        self.sample = sample
+        self.random = random.Random(seed)
+        self.stats = SampleStats()
+
+    def indices(self, n):
+        """
+        Sorted indices of the sample for a list with `n` items, or None
+        if all items should be checked.
+        """
+        if isinstance(self.sample, float):
+            k = int(math.ceil(n * self.sample))
+        else:
+            k = self.sample
+        k = max(k, 2)
+        if k >= n:
+            self.stats.checked += n
+            return None
+        self.stats.checked += k
+        self.stats.skipped += n - k
+        # first, last and one random item from each of the parts between
+        parts = k - 2
+        size = (n - 2) / float(parts) if parts else 0
+        indices = [0]
+        for i in range(parts):
+            indices.append(self.random.randrange(1 + int(i * size), 1 + int((i + 1) * size)))
+        indices.append(n - 1)
+        return indices
+
+# nesting depth where dicts and lists are checked with _walk_items, to
+# avoid the recursion limit
+_RECURSION_DEPTH = 100
+
+class _Memo(object):
+    """
+    LRU cache of (node, data) pairs that were valid during a run.
+
+    Data is identified by its id and referenced by the cache, so that
+    the id can't be reused. Only pairs without any message are cached,
+    so that errors are reported for each position of an invalid object.
+
+    With `max_depth`, pairs are only valid at the same or a lower
+    depth.
+    """
+    def __init__(self, size):
+        self.size = size
+        # key -> (data, number of the last use, depth)
+        self.valid = {}
+        # (number, key) for each use, the outdated uses are skipped
+        self.uses = deque()
+        self.counter = 0
+
+    def hit(self, node, data, depth=0):
+        key = node, id(data)
+        entry = self.valid.get(key)
+        if entry is None or depth > entry[2]:
+            return False
+        self.use(key, entry[0], entry[2])
+        return True
+
+    def add(self, node, data, depth=0):
+        key = node, id(data)
+        entry = self.valid.get(key)
+        if entry is not None:
+            depth = max(depth, entry[2])
+        self.use(key, data, depth)
+        valid = self.valid
+        uses = self.uses
+        while len(valid) > self.size:
+            n, key = uses.popleft()
+            entry = valid.get(key)
+            if entry is not None and entry[1] == n:
+                del valid[key]
+
+    def use(self, key, data, depth):
+        self.counter += 1
+        self.valid[key] = data, self.counter, depth
+        self.uses.append((self.counter, key))
+        if len(self.uses) > 4 * self.size + 16:
+            # drop the outdated uses
+            self.uses = deque(sorted((entry[1], k) for k, entry in iteritems(self.valid)))
 
 def type_str(spec):
     if not isinstance(spec, type):
@@ -188,3 +779,868 @@ def type_matches(spec, data):
         spec_type = type(spec)
     return isinstance(data, spec_type)
 
+
+class CompiledSpec(object):
+    """
+    Validation plan of a spec, as returned by `compile`.
+
+    Can be passed to `Validator` and `validate` instead of the spec.
+    It can be pickled (with the spec), as long as the spec can be
+    pickled, see also `dictspec.cache`.
+    """
+    def __init__(self, spec, root):
+        self.spec = spec
+        self.root = root
+
+def compile(spec):
+    """
+    Compile `spec` into a `CompiledSpec`.
+
+    The spec is analyzed only once and the result can be reused for
+    any number of validations. The spec must not be modified after
+    it was compiled.
+
+    >>> plan = compile({required('foo'): [int]})
+    >>> validate(plan, {'foo': [1, 2, 3]})
+    """
+    return CompiledSpec(spec, _compile(spec, None))
+
+class _RecursionScope(object):
+    # target of recursive() placeholders within a recursive(spec)
+    def __init__(self):
+        self.node = None
+
+def _compile(spec, scope, resolve_subspec=True):
+    if resolve_subspec and hasattr(spec, 'subspec'):
+        if isinstance(spec, type_spec):
+            return _TypeSpecNode(spec, scope)
+        return _SubspecNode(spec, scope)
+
+    if isinstance(spec, recursive):
+        if spec.spec:
+            inner_scope = _RecursionScope()
+            inner_scope.node = _compile(spec.spec, inner_scope)
+            return inner_scope.node
+        if scope is None:
+            return _SpecErrorNode('found recursive() outside recursive spec')
+        return _RecursionNode(scope)
+
+    if isinstance(spec, anything):
+        return _ANYTHING
+
+    if isinstance(spec, one_of):
+        return _OneOfNode(spec, scope)
+    if isinstance(spec, dict):
+        return _DictNode(spec, scope)
+    if isinstance(spec, list):
+        return _ListNode(spec, scope)
+    return _TypeNode(spec)
+
+class _Node(object):
+    """
+    Compiled spec node. `check` validates `data` and reports all
+    errors to `run`.
+    """
+    def check(self, data, run):
+        raise NotImplementedError
+
+    def extract(self, data, run):
+        """
+        Check `data` and return the extracted data, see
+        `Validator.extract`.
+        """
+        self.check(data, run)
+        return data
+
+class _DispatchNode(_Node):
+    """
+    Node that selects another node for the data (e.g. one_of).
+    `select` returns None if no node matches, after reporting the error.
+    """
+    def select(self, data, run):
+        raise NotImplementedError
+
+    def check(self, data, run):
+        node = self.select(data, run)
+        if node is not None:
+            node.check(data, run)
+
+    def extract(self, data, run):
+        node = self.select(data, run)
+        if node is None:
+            return data
+        return node.extract(data, run)
+
+class _AnythingNode(_Node):
+    def check(self, data, run):
+        pass
+
+    def __reduce__(self):
+        # keep the singleton when unpickled
+        return '_ANYTHING'
+
+_ANYTHING = _AnythingNode()
+
+class _SpecErrorNode(_Node):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def check(self, data, run):
+        raise SpecError(self.msg)
+
+class _RecursionNode(_DispatchNode):
+    def __init__(self, scope):
+        self.scope = scope
+
+    def select(self, data, run):
+        return self.scope.node
+
+    def check(self, data, run):
+        self.scope.node.check(data, run)
+
+    def extract(self, data, run):
+        return self.scope.node.extract(data, run)
+
+class _TypeNode(_Node):
+    def __init__(self, spec):
+        self.type_name = type_str(spec)
+        if hasattr(spec, 'compare_type'):
+            self.compare_type = spec.compare_type
+            self.types = None
+            # compare_type of these only depends on the type of the data
+            self.static = type(spec) in (number, anything, recursive)
+        else:
+            self.compare_type = None
+            self.types = spec if isinstance(spec, type) else type(spec)
+            self.static = True
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.compare_type is not None:
+            # Python 2 can't pickle bound methods
+            state['compare_type'] = self.compare_type.__self__
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.compare_type is not None:
+            self.compare_type = self.compare_type.compare_type
+
+    def matches(self, data):
+        if self.types is not None:
+            return isinstance(data, self.types)
+        return self.compare_type(data)
+
+    def check(self, data, run):
+        if data is None:
+            data = {}
+        if not self.matches(data):
+            run.report('type', self, data)
+            return False
+        return True
+
+    def extract(self, data, run):
+        if _TypeNode.check(self, data, run) and data is None:
+            return {}
+        return data
+
+class _DictNode(_TypeNode):
+    def __init__(self, spec, scope):
+        _TypeNode.__init__(self, spec)
+        self.required = []
+        self.defaults = []
+        self.any_key = None
+        self.values = {}
+        for k, v in iteritems(spec):
+            if isinstance(k, required):
+                self.required.append(k)
+            elif isinstance(k, default):
+                self.defaults.append((str(k), k.value))
+            if isinstance(k, anything):
+                self.any_key = _compile(v, scope)
+            else:
+                self.values[k] = _compile(v, scope)
+
+    def check_head(self, data, run):
+        """
+        Check the type and the required keys, but not the values.
+        """
+        if not _TypeNode.check(self, data, run):
+            return False
+        if data is None:
+            data = {}
+        for k in self.required:
+            if k not in data:
+                run.report('missing', self, key=k)
+        return True
+
+    def child(self, key, run):
+        """
+        Node for the value of `key`, None for unknown keys.
+        """
+        if self.any_key is not None:
+            return self.any_key
+        node = self.values.get(key)
+        if node is None and not run.extracting:
+            run.report('unknown', self, key=key, info_only=True)
+        return node
+
+    def check(self, data, run):
+        memo = run.memo
+        if memo is not None:
+            # valid data might be too deep at a higher depth
+            depth = run.depth if run.max_depth else 0
+            if memo.hit(self, data, depth):
+                return
+            mark = run.count
+        if not self.check_head(data, run):
+            return
+        if run.depth >= run.depth_limit:
+            return run.check_deep(self, data)
+        if not data or self.any_key is _ANYTHING:
+            return
+        run.depth += 1
+        any_key = self.any_key
+        values = self.values
+        obj_pos = run.context.obj_pos
+        for k, value in iteritems(data):
+            if any_key is not None:
+                node = any_key
+            else:
+                node = values.get(k)
+                if node is None:
+                    run.report('unknown', self, key=k, info_only=True)
+                    continue
+            obj_pos.append(k)
+            node.check(value, run)
+            obj_pos.pop()
+        run.depth -= 1
+        if memo is not None and run.count == mark:
+            memo.add(self, data, depth)
+
+    def extract(self, data, run):
+        if not self.check_head(data, run):
+            return data
+        if run.depth >= run.depth_limit:
+            return run.extract_deep(self, data)
+        result = {}
+        if data:
+            run.depth += 1
+            obj_pos = run.context.obj_pos
+            for k, value in iteritems(data):
+                node = self.child(k, run)
+                if node is not None:
+                    obj_pos.append(k)
+                    result[k] = node.extract(value, run)
+                    obj_pos.pop()
+            run.depth -= 1
+        _add_defaults(result, self.defaults)
+        return result
+
+class _ListNode(_TypeNode):
+    def __init__(self, spec, scope):
+        _TypeNode.__init__(self, spec)
+        self.spec = spec
+        if len(spec) == 1:
+            self.item = _compile(spec[0], scope)
+        else:
+            self.item = None
+        # items can be checked by their types, see check_bulk
+        self.bulk = _is_bulk(self.item)
+        # (key, node, bulk) for lists of dicts, see check_columns
+        self.columns = None
+        item = self.item
+        if type(item) is _DictNode and item.any_key is None and item.values:
+            self.columns = [(k, node, _is_bulk(node)) for k, node in iteritems(item.values)]
+            self.row_values = dict((k, node) for k, node, bulk in self.columns if not bulk)
+
+    def check_head(self, data, run):
+        """
+        Check the type, but not the items.
+        """
+        if not self.matches({} if data is None else data):
+            if not (run.accept_arrays and _is_array(data)):
+                run.report('type', self, {} if data is None else data)
+                return False
+        if self.item is None:
+            raise SpecError('lists support only one type, got: %s' % self.spec)
+        return True
+
+    def check_bulk(self, data):
+        """
+        Check all items by their (distinct) types, without checking each
+        item. Returns True if all items are valid and False if the items
+        need to be checked one by one (e.g. to locate the errors).
+        """
+        if not self.bulk:
+            return False
+        item = self.item
+        if item is _ANYTHING:
+            return True
+        if not isinstance(data, list):
+            sample = _array_sample(data)
+            return sample is not None and item.matches(sample)
+        return _check_types(item, data)
+
+    def extract_bulk(self, data):
+        """
+        Copy of a list that passed `check_bulk`. None items are replaced
+        by {}, like in `_TypeNode.extract`.
+        """
+        if self.item is not _ANYTHING and any(value is None for value in data):
+            return [{} if value is None else value for value in data]
+        return list(data)
+
+    def check(self, data, run):
+        if not self.check_head(data, run):
+            return
+        if run.depth >= run.depth_limit:
+            return run.check_deep(self, data)
+        if run.sampler is not None:
+            indices = run.sampler.indices(len(data))
+            if indices is not None:
+                return self.check_sample(data, indices, run)
+        if self.check_bulk(data):
+            return
+        memo = run.memo
+        if memo is not None:
+            # valid data might be too deep at a higher depth
+            depth = run.depth if run.max_depth else 0
+            if memo.hit(self, data, depth):
+                return
+            mark = run.count
+        elif (self.columns is not None and len(data) >= _COLUMNS_SIZE
+            and not (run.max_depth and run.depth + 1 >= run.max_depth)
+            and self.check_columns(data, run)):
+            return
+        run.depth += 1
+        item = self.item
+        obj_pos = run.context.obj_pos
+        index = [0]
+        obj_pos.append(index)
+        for i, value in enumerate(data):
+            index[0] = i
+            item.check(value, run)
+        obj_pos.pop()
+        run.depth -= 1
+        if memo is not None and run.count == mark:
+            memo.add(self, data, depth)
+
+    def extract(self, data, run):
+        if not self.check_head(data, run):
+            return data
+        if run.depth >= run.depth_limit:
+            return run.extract_deep(self, data)
+        if not isinstance(data, list):
+            # array
+            self.check(data, run)
+            return data
+        if self.check_bulk(data):
+            return self.extract_bulk(data)
+        run.depth += 1
+        item = self.item
+        obj_pos = run.context.obj_pos
+        index = [0]
+        obj_pos.append(index)
+        result = []
+        for i, value in enumerate(data):
+            index[0] = i
+            result.append(item.extract(value, run))
+        obj_pos.pop()
+        run.depth -= 1
+        return result
+
+    def check_columns(self, data, run, offset=0):
+        """
+        Check a list of dicts column by column: the types of the dicts,
+        the required and unknown keys and the values that can be checked
+        by their types, for all dicts at once. The other values are
+        checked dict by dict. Returns False if the items need to be
+        checked one by one (e.g. to locate the errors).
+
+        `offset` is the index of the first dict, if `data` is a part of
+        the list.
+        """
+        keys = self.column_keys(data)
+        if keys is None:
+            return False
+        row_values = self.row_values
+        if not keys.intersection(row_values):
+            return True
+        run.depth += 2
+        obj_pos = run.context.obj_pos
+        index = [0]
+        obj_pos.append(index)
+        for i, d in enumerate(data, offset):
+            index[0] = i
+            for k, value in iteritems(d):
+                node = row_values.get(k)
+                if node is not None:
+                    obj_pos.append(k)
+                    node.check(value, run)
+                    obj_pos.pop()
+        obj_pos.pop()
+        run.depth -= 2
+        return True
+
+    def column_keys(self, data):
+        """
+        First part of `check_columns`, without the values that are
+        checked dict by dict. Returns the keys of all dicts, or None.
+        """
+        if type(data) is not list or set(map(type, data)) != _DICT_TYPES:
+            return None
+        item = self.item
+        keys = set(chain.from_iterable(data))
+        if not keys.issubset(item.values):
+            return None
+        for k in item.required:
+            if k not in keys or not all(map(contains, data, [k] * len(data))):
+                return None
+        for k, node, bulk in self.columns:
+            if not bulk or node is _ANYTHING or k not in keys:
+                continue
+            try:
+                column = list(map(itemgetter(k), data))
+            except KeyError:
+                # optional key
+                column = [d[k] for d in data if k in d]
+            if not _check_types(node, column):
+                return None
+        return keys
+
+    def check_sample(self, data, indices, run):
+        run.depth += 1
+        item = self.item
+        obj_pos = run.context.obj_pos
+        index = [0]
+        obj_pos.append(index)
+        for i in indices:
+            index[0] = i
+            item.check(data[i], run)
+        obj_pos.pop()
+        run.depth -= 1
+
+_NoneType = type(None)
+_DICT_TYPES = set([dict])
+
+# minimal length of lists for check_columns
+_COLUMNS_SIZE = 16
+
+def _is_bulk(node):
+    # node checks values only by their type
+    return node is _ANYTHING or (type(node) is _TypeNode and node.static)
+
+def _check_types(node, values):
+    """
+    Check all `values` with the static type node `node`, by their
+    (distinct) types.
+    """
+    for t in set(map(type, values)):
+        if t is _NoneType:
+            if not node.matches({}):
+                return False
+        elif node.types is not None:
+            if not issubclass(t, node.types):
+                return False
+        else:
+            for sample in values:
+                if type(sample) is t:
+                    break
+            if not node.matches(sample):
+                return False
+    return True
+
+def _is_array(data):
+    """
+    True for array.array and one-dimensional NumPy arrays.
+    """
+    if isinstance(data, array.array):
+        return True
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(data, numpy.ndarray) and data.ndim == 1
+
+# sample values for the items of arrays
+_TYPECODE_SAMPLES = dict([(c, 0) for c in 'bBhHiIlLqQ'] + [('f', 0.0), ('d', 0.0),
+    ('u', text_type()), ('w', text_type()), ('c', str())])
+_DTYPE_KIND_SAMPLES = {'b': False, 'i': 0, 'u': 0, 'f': 0.0, 'c': 0j,
+    'U': text_type(), 'S': bytes()}
+
+def _array_sample(data):
+    """
+    Sample value of the item type of an array.array or NumPy array, or
+    None if the items need to be checked one by one.
+    """
+    if isinstance(data, array.array):
+        return _TYPECODE_SAMPLES.get(data.typecode)
+    dtype = getattr(data, 'dtype', None)
+    if dtype is None:
+        return None
+    return _DTYPE_KIND_SAMPLES.get(dtype.kind)
+
+class _UnionNode(_DispatchNode):
+    """
+    Tagged union of nodes. `select` looks up the node for the tag of
+    the data in `dispatch`, e.g. the type of the data for one_of or the
+    value of the type key for type_spec.
+    """
+    dispatch = None
+
+# no alternative of a one_of matches
+_NO_MATCH = object()
+
+# limit for the number of cached types of a one_of
+_MAX_DISPATCH_TYPES = 64
+
+class _OneOfNode(_UnionNode):
+    def __init__(self, spec, scope):
+        self.alternatives = [(_TypeNode(s), _compile(s, scope)) for s in spec.specs]
+        self.type_names = ', '.join(map(type_str, spec.specs))
+        # type of data -> first matching node, filled on first use of a type
+        self.dispatch = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['dispatch'] = {}
+        return state
+
+    def select(self, data, run):
+        if data is None:
+            data = {}
+        node = self.dispatch.get(type(data))
+        if node is None:
+            node = self.probe(data)
+        if node is _NO_MATCH:
+            run.report('one_of', self, data)
+            return None
+        return node
+
+    def probe(self, data):
+        """
+        Return the node of the first spec with a matching type. The
+        result is cached for the type of `data`, unless it depends on
+        custom `compare_type` specs.
+        """
+        cacheable = type(data) is getattr(data, '__class__', None)
+        for type_node, node in self.alternatives:
+            cacheable = cacheable and type_node.static
+            if type_node.matches(data):
+                break
+        else:
+            node = _NO_MATCH
+        if cacheable and len(self.dispatch) < _MAX_DISPATCH_TYPES:
+            self.dispatch[type(data)] = node
+        return node
+
+    def check(self, data, run):
+        # None is checked like {}, the nodes of dicts handle None
+        key = {} if data is None else data
+        node = self.dispatch.get(type(key))
+        if node is None:
+            node = self.probe(key)
+        if node is _NO_MATCH:
+            run.report('one_of', self, key)
+        else:
+            node.check(data, run)
+
+class _TypeSpecNode(_UnionNode):
+    def __init__(self, spec, scope):
+        self.type_key = spec.type_key
+        self.dispatch = dict((k, _compile(s, scope, resolve_subspec=False))
+            for k, s in iteritems(spec.specs))
+
+    def select(self, data, run):
+        if not data:
+            return run.report('empty', self, data)
+        if self.type_key not in data:
+            return run.report('type_key', self, data)
+        key = data[self.type_key]
+        if key not in self.dispatch:
+            return run.report('type_value', self, data, key=key)
+        return self.dispatch[key]
+
+class _SubspecNode(_DispatchNode):
+    # specs with a custom subspec method, resolved for each datum
+    def __init__(self, spec, scope):
+        self.spec = spec
+        self.scope = scope
+        self.compiled = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # keyed by ids of this process
+        state['compiled'] = {}
+        return state
+
+    def select(self, data, run):
+        try:
+            subspec = self.spec.subspec(data, run.context)
+        except ValueError as ex:
+            return run.report('custom', self, data, text=str(ex))
+        try:
+            return self.compiled[id(subspec)][1]
+        except KeyError:
+            node = _compile(subspec, self.scope, resolve_subspec=False)
+            # keep subspec referenced so that its id stays unique
+            self.compiled[id(subspec)] = (subspec, node)
+            return node
+
+def _free_threading():
+    # True for Python builds without GIL (or with a disabled GIL)
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return (ThreadPoolExecutor is not None and is_gil_enabled is not None
+        and not is_gil_enabled())
+
+# levels of the data that are searched for large dicts and lists
+_PARALLEL_LEVELS = 4
+
+class _Parallel(object):
+    """
+    Parallel validation for `Validator.validate` with `threads`.
+
+    Checks the data like `check` of the nodes, but dicts and lists with
+    at least `parallel_size` values (in the first levels of the data)
+    are split into chunks. Each chunk is checked in a thread with its
+    own `_ChunkRun`. The messages of the chunks are passed to the run
+    in the order of the chunks, so that the result is the same as for
+    a sequential validation.
+    """
+    def __init__(self, validator, run):
+        self.validator = validator
+        self.run = run
+        self.size = max(1, validator.parallel_size)
+        self.threads = validator.threads
+        self.pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def check(self, node, data, level):
+        run = self.run
+        while isinstance(node, _DispatchNode):
+            node = node.select(data, run)
+            if node is None:
+                return
+        if (level >= _PARALLEL_LEVELS or not isinstance(node, (_DictNode, _ListNode))
+            or type(data) not in (dict, list) or run.depth >= run.depth_limit):
+            return node.check(data, run)
+        if not node.check_head(data, run):
+            return
+        obj_pos = run.context.obj_pos
+        if isinstance(node, _DictNode):
+            if not data or node.any_key is _ANYTHING:
+                return
+            if len(data) >= self.size:
+                return self.check_chunks(node, list(iteritems(data)))
+            run.depth += 1
+            for k, value in iteritems(data):
+                child = node.child(k, run)
+                if child is not None:
+                    obj_pos.append(k)
+                    self.check(child, value, level + 1)
+                    obj_pos.pop()
+            run.depth -= 1
+        else:
+            if node.check_bulk(data):
+                return
+            if len(data) >= self.size:
+                return self.check_chunks(node, data)
+            run.depth += 1
+            index = [0]
+            obj_pos.append(index)
+            for i, value in enumerate(data):
+                index[0] = i
+                self.check(node.item, value, level + 1)
+            obj_pos.pop()
+            run.depth -= 1
+
+    def check_chunks(self, node, data):
+        """
+        Check the (key, value) pairs of a dict node or the items of a
+        list node in parallel.
+        """
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.threads)
+        run = self.run
+        step = -(-len(data) // (self.threads * 4))
+        # copy of the position, with copies of the list positions
+        pos = [list(p) if isinstance(p, list) else p for p in run.context.obj_pos]
+        futures = [self.pool.submit(self.check_chunk, node, data, start,
+            min(start + step, len(data)), pos, run.depth) for start in range(0, len(data), step)]
+        try:
+            for future in futures:
+                for msg in future.result():
+                    run.handle_error(msg, info_only=msg.info_only)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def check_chunk(self, node, data, start, stop, pos, depth):
+        v = self.validator
+        run = _ChunkRun(v.raise_first_error, accept_arrays=v.accept_arrays,
+            cache_size=v.cache_size, max_errors=v.max_errors, max_depth=v.max_depth)
+        obj_pos = run.context.obj_pos
+        obj_pos.extend(pos)
+        run.depth = depth
+        try:
+            if isinstance(node, _DictNode):
+                run.depth += 1
+                for k, value in data[start:stop]:
+                    child = node.child(k, run)
+                    if child is not None:
+                        obj_pos.append(k)
+                        child.check(value, run)
+                        obj_pos.pop()
+            elif (node.columns is None or stop - start < _COLUMNS_SIZE
+                or (run.max_depth and run.depth + 1 >= run.max_depth)
+                or not node.check_columns(data[start:stop], run, start)):
+                run.depth += 1
+                item = node.item
+                index = [0]
+                obj_pos.append(index)
+                for i in range(start, stop):
+                    index[0] = i
+                    item.check(data[i], run)
+        except _Invalid:
+            pass
+        return run.messages
+
+def _walk(root, data, run, steps=1000):
+    """
+    Validate `data` like ``root.check(data, run)``, but with an explicit
+    stack for the dicts and lists, instead of recursive `check` calls.
+    Yields after every `steps` values, so that the validation can be
+    paused.
+    """
+    items = _items(root, data, run, run.max_depth and run.depth >= run.max_depth)
+    if items is not None:
+        for _ in _walk_items(items, run, steps):
+            yield
+
+def _walk_items(items, run, steps):
+    """
+    Check the values from the `items` iterator of a dict or list, see
+    `_walk`. Never yields if `steps` is 0.
+    """
+    obj_pos = run.context.obj_pos
+    frames = [items]
+    # number of frames for max_depth
+    max_depth = run.max_depth - run.depth
+    count = 0
+    while frames:
+        for key, node, value in frames[-1]:
+            break
+        else:
+            frames.pop()
+            if frames:
+                obj_pos.pop()
+            continue
+
+        count += 1
+        if count == steps:
+            count = 0
+            yield
+
+        obj_pos.append(key)
+        if isinstance(value, (dict, list)):
+            items = _items(node, value, run, run.max_depth and len(frames) >= max_depth)
+            if items is not None:
+                frames.append(items)
+                continue
+        else:
+            node.check(value, run)
+        obj_pos.pop()
+
+def _items(node, data, run, too_deep=False):
+    """
+    Check `data` without its values or items. Returns an iterator of
+    (key, node, value) for each value or item that needs to be checked,
+    or None. Reports dicts and lists as errors if `too_deep`.
+    """
+    while isinstance(node, _DispatchNode):
+        node = node.select(data, run)
+        if node is None:
+            return None
+    if isinstance(node, (_DictNode, _ListNode)):
+        if node.check_head(data, run):
+            if too_deep and isinstance(data, (dict, list)):
+                run.report('depth', node, data, key=run.max_depth)
+                return None
+            return _values(node, data, run)
+    else:
+        node.check(data, run)
+    return None
+
+def _values(node, data, run):
+    # iterator for the values of a dict or list node, after check_head
+    if isinstance(node, _DictNode):
+        if data and node.any_key is not _ANYTHING:
+            return _dict_items(node, data, run)
+    else:
+        if run.sampler is not None:
+            indices = run.sampler.indices(len(data))
+            if indices is not None:
+                return _list_items(node, data, indices)
+        if not node.check_bulk(data):
+            return _list_items(node, data)
+    return None
+
+def _extract_items(node, value, run, too_deep=False):
+    """
+    Extract `value` without its values or items, see `_items`. Returns
+    the copy, an iterator of (key, node, value) for the values or items
+    to add to the copy (or None) and the defaults to add after them.
+    """
+    while isinstance(node, _DispatchNode):
+        node = node.select(value, run)
+        if node is None:
+            return value, None, ()
+    if isinstance(node, (_DictNode, _ListNode)):
+        if not node.check_head(value, run):
+            return value, None, ()
+        if too_deep and isinstance(value, (dict, list)):
+            run.report('depth', node, value, key=run.max_depth)
+            return value, None, ()
+        return _extract_values(node, value, run)
+    return node.extract(value, run), None, ()
+
+def _extract_values(node, data, run):
+    # see _extract_items, after check_head
+    if isinstance(node, _DictNode):
+        if data:
+            return {}, _dict_items(node, data, run), node.defaults
+        result = {}
+        _add_defaults(result, node.defaults)
+        return result, None, ()
+    if not isinstance(data, list):
+        # array
+        node.check(data, run)
+        return data, None, ()
+    if node.check_bulk(data):
+        return node.extract_bulk(data), None, ()
+    return [], _list_items(node, data), ()
+
+def _add_defaults(result, defaults):
+    for k, value in defaults:
+        if k not in result:
+            result[k] = copy.deepcopy(value)
+
+def _dict_items(node, data, run):
+    for k, value in iteritems(data):
+        child = node.child(k, run)
+        if child is not None:
+            yield k, child, value
+
+def _list_items(node, data, indices=None):
+    # a single index cell for all items, see Context
+    index = [0]
+    item = node.item
+    if indices is not None:
+        for i in indices:
+            index[0] = i
+            yield index, item, data[i]
+        return
+    for i, value in enumerate(data):
+        index[0] = i
+        yield index, item, value